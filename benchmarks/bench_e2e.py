@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from corpus import write_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPTS = os.path.join(ROOT, "scripts")
+DEFAULT_CONFIGS = [
+    "sequential=--packing sequential",
+    "ffd=--packing ffd",
+    "ffd-c8=--packing ffd --concurrency 8",
+    "autotune=--packing ffd --autotune",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against the local mock translator.")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--files", type=int, default=1, help="More than one runs translate_all.py over a directory.")
+    parser.add_argument(
+        "--length",
+        default="lognormal:2.3,0.8",
+        help="Words per string: fixed:N, uniform:LO,HI or lognormal:MU,SIGMA.",
+    )
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Share of rows repeating an earlier source.")
+    parser.add_argument("--placeholders", type=float, default=0.15, help="Chance of a placeholder after each word.")
+    parser.add_argument("--translated", type=float, default=0.0, help="Share of rows that already have a translation.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--mock-args",
+        default="--latency lognormal:-3,0.5",
+        help="Extra arguments for mock_translator.py.",
+    )
+    parser.add_argument(
+        "--config",
+        action="append",
+        dest="configs",
+        help="NAME=ARGS passed to the translator; repeatable. Defaults compare packing and concurrency.",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per config; the median by rows/s is reported.")
+    parser.add_argument("--json", dest="json_path", help="Write the results here.")
+    parser.add_argument("--baseline", help="Results JSON of an earlier version to compare against.")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Exit with 1 if rows/s of any config drops by more than this fraction against --baseline.",
+    )
+    return parser.parse_args()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest-rank percentile.
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def start_mock(mock_args: str) -> Tuple[subprocess.Popen, str]:
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS, "mock_translator.py"), "--port", "0", *shlex.split(mock_args)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = proc.stdout.readline() if proc.stdout is not None else ""
+    if "http://" not in line:
+        proc.kill()
+        raise RuntimeError(f"Mock translator did not start: {line.strip()}")
+    return proc, line.strip().split()[-1]
+
+
+def run_config(name: str, extra: str, inputs: str, workdir: str, endpoint: str, files: int) -> Dict[str, float]:
+    stats_path = os.path.join(workdir, f"{name}.stats.json")
+    extra_args = shlex.split(extra)
+    if files > 1:
+        cmd = [
+            sys.executable,
+            os.path.join(SCRIPTS, "translate_all.py"),
+            inputs,
+            "--out-dir",
+            os.path.join(workdir, name),
+        ]
+    else:
+        cmd = [
+            sys.executable,
+            os.path.join(SCRIPTS, "translate_tsv.py"),
+            "--in",
+            inputs,
+            "--out",
+            os.path.join(workdir, name, "out.tsv"),
+        ]
+    cmd += ["--stats-json", stats_path, *extra_args]
+    if "--no-memory" not in extra_args and "--memory" not in extra_args:
+        # A fresh memory per run, so no config profits from an earlier one.
+        cmd += ["--memory", os.path.join(workdir, f"{name}.sqlite")]
+    env = dict(os.environ)
+    env.update(
+        {
+            "AZURE_TRANSLATOR_ENDPOINT": endpoint,
+            "AZURE_TRANSLATOR_KEY": "bench",
+            "AZURE_TRANSLATOR_REGION": "local",
+            # The mock enforces its own quota; keep the client limiter out of the way.
+            "TRANSLATE_CHARS_PER_MINUTE": "1000000000",
+            "TRANSLATE_REQUESTS_PER_SECOND": "100000",
+        }
+    )
+    with open(os.path.join(workdir, f"{name}.log"), "w", encoding="utf-8") as log:
+        started = time.monotonic()
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.monotonic() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name}: translator exited with {proc.returncode}, see {log.name}")
+    with open(stats_path, "r", encoding="utf-8") as infile:
+        stats = json.load(infile)
+    elapsed = stats["elapsed"] or 1e-9
+    latencies = stats["batch_latencies"]
+    return {
+        "rows_per_s": stats["eligible_rows"] / elapsed,
+        "chars_per_s": stats["chars_sent"] / elapsed,
+        "requests": stats["http_requests"],
+        "throttled": stats["throttled"],
+        "chars_sent": stats["chars_sent"],
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mib": usage.ru_maxrss / 1024,
+        "elapsed": elapsed,
+        "wall": wall,
+    }
+
+
+def print_table(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]]) -> None:
+    header = (
+        f"{'config':<14} {'rows/s':>9} {'chars/s':>10} {'requests':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MiB':>8}"
+    )
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    for name, result in results.items():
+        line = (
+            f"{name:<14} {result['rows_per_s']:9.0f} {result['chars_per_s']:10.0f} {result['requests']:8.0f} "
+            f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f} {result['peak_rss_mib']:8.1f}"
+        )
+        if baseline and name in baseline:
+            change = result["rows_per_s"] / max(1e-9, baseline[name]["rows_per_s"]) - 1
+            line += f" {change:+8.1%}"
+        print(line)
+
+
+def main() -> int:
+    args = parse_args()
+    configs = []
+    for spec in args.configs or DEFAULT_CONFIGS:
+        name, _, extra = spec.partition("=")
+        configs.append((name.strip(), extra))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as infile:
+            baseline = json.load(infile)["results"]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.files > 1:
+            inputs = os.path.join(workdir, "input")
+            os.makedirs(inputs)
+            paths = [os.path.join(inputs, f"corpus_{idx}.tsv") for idx in range(args.files)]
+        else:
+            inputs = os.path.join(workdir, "corpus.tsv")
+            paths = [inputs]
+        chars = 0
+        for idx, path in enumerate(paths):
+            chars += write_corpus(
+                path,
+                args.rows // len(paths),
+                length=args.length,
+                density=args.placeholders,
+                duplicates=args.duplicates,
+                translated=args.translated,
+                seed=args.seed + idx,
+            )
+        print(f"Corpus: {args.rows} rows in {len(paths)} file(s), {chars} source characters")
+
+        mock, endpoint = start_mock(args.mock_args)
+        results: Dict[str, Dict[str, float]] = {}
+        try:
+            for name, extra in configs:
+                runs = [
+                    run_config(f"{name}-{attempt}", extra, inputs, workdir, endpoint, len(paths))
+                    for attempt in range(args.repeat)
+                ]
+                runs.sort(key=lambda result: result["rows_per_s"])
+                results[name] = runs[len(runs) // 2]
+                print(f"  {name}: {results[name]['elapsed']:.1f}s", file=sys.stderr)
+        finally:
+            mock.terminate()
+            mock.wait()
+
+    print_table(results, baseline)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as outfile:
+            json.dump({"corpus": vars(args), "results": results}, outfile, indent=2)
+    if baseline and args.max_regression is not None:
+        regressed = [
+            name
+            for name, result in results.items()
+            if name in baseline and result["rows_per_s"] < baseline[name]["rows_per_s"] * (1 - args.max_regression)
+        ]
+        if regressed:
+            print(
+                f"ERROR: Throughput regressed beyond {args.max_regression:.0%}: {', '.join(regressed)}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from corpus import PLACEHOLDER_KINDS, generate_texts
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from placeholders import (  # noqa: E402
+    PH_RE,
+    PLACEHOLDER_PATTERN,
+    mask_placeholders,
+    placeholders_match,
+    restore_placeholders,
+)
+
+CALIBRATION_LOOPS = 100_000
+MIN_SAMPLE_SECONDS = 0.02
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "placeholders.json")
+# (words per string, placeholder chance after each word) for each corpus.
+PROFILES: Dict[str, Tuple[str, float]] = {
+    "plain": ("lognormal:2.3,0.8", 0.0),
+    "typical": ("lognormal:2.3,0.8", 0.15),
+    "tag-heavy": ("uniform:10,40", 0.8),
+    "long": ("uniform:150,400", 0.1),
+}
+# Fuzz strings are mostly made of characters the placeholder alternatives care about.
+FUZZ_ALPHABET = "\\%{}<>/=#.-+_ntdsfAZ09 xé"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for scripts/placeholders.py.")
+    parser.add_argument("--rows", type=int, default=5_000, help="Strings per corpus.")
+    parser.add_argument("--repeat", type=int, default=15, help="Timing runs per case.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also time the previous implementations: the closure-based mask and the str.replace restore loop.",
+    )
+    parser.add_argument(
+        "--fuzz",
+        type=int,
+        default=100_000,
+        help="Fuzzed strings checked against the previous mask implementation before timing; 0 skips the check.",
+    )
+    parser.add_argument(
+        "--save",
+        metavar="PATH",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        help="Store results as a baseline.",
+    )
+    parser.add_argument("--check", metavar="PATH", nargs="?", const=DEFAULT_BASELINE, help="Compare with a baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed drop of normalized ops/s for --check.")
+    return parser.parse_args()
+
+
+def mask_closure_sub(text: str) -> Tuple[str, List[str]]:
+    placeholders: List[str] = []
+
+    def repl(match: re.Match) -> str:
+        placeholders.append(match.group(0))
+        return f"__PH{len(placeholders) - 1}__"
+
+    masked = PLACEHOLDER_PATTERN.sub(repl, text)
+    return masked, placeholders
+
+
+def restore_replace_loop(text: str, placeholders: List[str]) -> str:
+    for idx, token in enumerate(placeholders):
+        text = text.replace(f"__PH{idx}__", token)
+    return text
+
+
+def fuzz_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        roll = rng.random()
+        if roll < 0.3:
+            parts.append(rng.choice(PLACEHOLDER_KINDS)(rng))
+        elif roll < 0.4:
+            parts.append(f"__PH{rng.randint(0, 20)}__")
+        else:
+            parts.append("".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(1, 8))))
+    return "".join(parts)
+
+
+def check_mask(texts: List[str]) -> None:
+    for text in texts:
+        expected = mask_closure_sub(text)
+        actual = mask_placeholders(text)
+        if actual != expected:
+            raise AssertionError(f"mask_placeholders({text!r}) = {actual!r}, expected {expected!r}")
+        # A __PHn__ the text already had outside its placeholders cannot
+        # round-trip; one inside a placeholder, like {__PH1__}, must.
+        masked, placeholders = actual
+        if PH_RE.findall(masked) != [f"__PH{idx}__" for idx in range(len(placeholders))]:
+            continue
+        if restore_placeholders(masked, placeholders) != text:
+            raise AssertionError(f"Round trip failed for {text!r}")
+
+
+def calibrate() -> float:
+    # A fixed pure-Python workload, timed next to every run of a case; dividing
+    # by it cancels out machine speed and most of the drift on shared hosts.
+    started = time.perf_counter()
+    total = 0
+    for idx in range(CALIBRATION_LOOPS):
+        total += idx * idx
+    return time.perf_counter() - started
+
+
+def measure(call: Callable[[], None], count: int, repeat: int) -> Tuple[float, float]:
+    # Returns (best ops/s, median ops per calibration loop). Fast cases are
+    # looped so every sample lasts at least MIN_SAMPLE_SECONDS.
+    started = time.perf_counter()
+    call()
+    loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / max(1e-9, time.perf_counter() - started)))
+    best = float("inf")
+    ratios = []
+    for _ in range(repeat):
+        reference = calibrate()
+        started = time.perf_counter()
+        for _ in range(loops):
+            call()
+        elapsed = (time.perf_counter() - started) / loops
+        best = min(best, elapsed)
+        ratios.append(count * reference / CALIBRATION_LOOPS / elapsed)
+    return count / best, statistics.median(ratios)
+
+
+def bench_profile(texts: List[str], repeat: int, legacy: bool) -> Dict[str, Tuple[float, float]]:
+    check_mask(texts)
+    masked = [mask_placeholders(text) for text in texts]
+
+    def run_mask() -> None:
+        for text in texts:
+            mask_placeholders(text)
+
+    def run_restore() -> None:
+        for masked_text, placeholders in masked:
+            restore_placeholders(masked_text, placeholders)
+
+    def run_legacy_mask() -> None:
+        for text in texts:
+            mask_closure_sub(text)
+
+    def run_legacy_restore() -> None:
+        for masked_text, placeholders in masked:
+            restore_replace_loop(masked_text, placeholders)
+
+    def run_match() -> None:
+        for masked_text, _ in masked:
+            placeholders_match(masked_text, masked_text)
+
+    results = {
+        "mask_placeholders": measure(run_mask, len(texts), repeat),
+        "restore_placeholders": measure(run_restore, len(texts), repeat),
+        "placeholders_match": measure(run_match, len(texts), repeat),
+    }
+    if legacy:
+        results["mask (closure sub)"] = measure(run_legacy_mask, len(texts), repeat)
+        results["restore (replace loop)"] = measure(run_legacy_restore, len(texts), repeat)
+    return results
+
+
+def main() -> int:
+    args = parse_args()
+    if args.fuzz:
+        rng = random.Random(args.seed)
+        check_mask([fuzz_text(rng) for _ in range(args.fuzz)])
+        print(f"Fuzz: {args.fuzz} strings masked identically to the closure-based implementation and restored")
+    results: Dict[str, Dict[str, Tuple[float, float]]] = {}
+    print(f"{'corpus':<10} {'function':<24} {'ops/s':>12} {'normalized':>11}")
+    for profile, (length, density) in PROFILES.items():
+        texts = list(generate_texts(args.rows, length, density, 0.0, args.seed))
+        results[profile] = bench_profile(texts, args.repeat, args.legacy)
+        for name, (ops, normalized) in results[profile].items():
+            print(f"{profile:<10} {name:<24} {ops:12.0f} {normalized:11.4f}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as outfile:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "rows": args.rows,
+                    "seed": args.seed,
+                    "results": {
+                        profile: {
+                            name: {"ops_per_s": ops, "normalized": normalized}
+                            for name, (ops, normalized) in functions.items()
+                        }
+                        for profile, functions in results.items()
+                    },
+                },
+                outfile,
+                indent=2,
+            )
+        print(f"Baseline saved: {args.save}")
+
+    if args.check:
+        with open(args.check, "r", encoding="utf-8") as infile:
+            baseline = json.load(infile)
+        regressions = []
+        for profile, functions in baseline["results"].items():
+            for name, base in functions.items():
+                if name not in results.get(profile, {}):
+                    continue
+                change = results[profile][name][1] / base["normalized"] - 1
+                if change < -args.tolerance:
+                    regressions.append(f"{profile}/{name} {change:+.1%}")
+        if regressions:
+            print(
+                f"ERROR: Slower than {args.check} beyond {args.tolerance:.0%}: {', '.join(regressions)}",
+                file=sys.stderr,
+            )
+            return 1
+        print(f"No regressions against {args.check} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from corpus import write_corpus
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from rows import read_tables  # noqa: E402
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare memory of list(DictReader) and RowTable.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def load_dicts(path: str) -> object:
+    with open(path, "r", encoding="utf-8", newline="") as infile:
+        return list(csv.DictReader(infile, delimiter="\t"))
+
+
+def load_table(path: str) -> object:
+    with open(path, "r", encoding="utf-8", newline="") as infile:
+        reader = csv.reader(infile, delimiter="\t")
+        fieldnames = next(reader)
+        return next(read_tables(reader, fieldnames))
+
+
+def measure(load: Callable[[str], object], path: str) -> Tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    loaded = load(path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return peak / (1024 * 1024), elapsed
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "corpus.tsv")
+        write_corpus(path, args.rows, length="uniform:1,12", density=0.0, duplicates=0.0, seed=args.seed)
+        size = os.path.getsize(path) / (1024 * 1024)
+        print(f"Corpus: {args.rows} rows, {size:.1f} MiB")
+        results = {}
+        for name, load in (("list(DictReader)", load_dicts), ("RowTable", load_table)):
+            peak, elapsed = measure(load, path)
+            results[name] = peak
+            print(f"{name:<18} peak {peak:9.1f} MiB  load {elapsed:6.2f}s")
+        print(f"Memory saved: {1 - results['RowTable'] / results['list(DictReader)']:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+import csv
+import random
+from typing import Callable, Iterator, List
+
+WORDS = (
+    "open the door you have coins cancel ok item sword shield quest dragon fire ice potion gold "
+    "level enemy attack defend village merchant buy sell health mana spell armor ring map"
+).split()
+
+# One generator per PLACEHOLDER_PATTERN alternative, in the same order.
+PLACEHOLDER_KINDS: List[Callable[[random.Random], str]] = [
+    lambda rng: rng.choice(["\\n", "\\t"]),
+    lambda rng: "%" + rng.choice(["ITEM_NAME", "PLAYER", "GOLD_2", "NPC"]),
+    lambda rng: rng.choice(["%d", "%s", "%.2f", "%-5d", "%+d", "%i"]),
+    lambda rng: rng.choice(["{0}", "{1}", "{player_name}", "{count}", "{item}"]),
+    lambda rng: rng.choice(["<b>", "</b>", "<color=#ffcc00>", "</color>", "<br/>", "<i>", "</i>"]),
+]
+
+
+def make_distribution(spec: str) -> Callable[[random.Random], int]:
+    # fixed:N, uniform:LO,HI or lognormal:MU,SIGMA; always at least 1.
+    kind, _, raw = spec.partition(":")
+    values = [float(value) for value in raw.split(",") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: max(1, int(values[0]))
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.randint(max(1, int(values[0])), max(1, int(values[1])))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: max(1, round(rng.lognormvariate(values[0], values[1])))
+    raise ValueError(f"Bad distribution spec: {spec}")
+
+
+def make_text(rng: random.Random, words: int, density: float) -> str:
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(WORDS))
+        if rng.random() < density:
+            parts.append(rng.choice(PLACEHOLDER_KINDS)(rng))
+    text = " ".join(parts)
+    return text[0].upper() + text[1:] + rng.choice([".", "!", "?", ""])
+
+
+def generate_texts(count: int, length: str, density: float, duplicates: float, seed: int) -> Iterator[str]:
+    rng = random.Random(seed)
+    words = make_distribution(length)
+    seen: List[str] = []
+    for _ in range(count):
+        if seen and rng.random() < duplicates:
+            yield rng.choice(seen)
+            continue
+        text = make_text(rng, words(rng), density)
+        seen.append(text)
+        yield text
+
+
+def write_corpus(
+    path: str,
+    rows: int,
+    length: str = "lognormal:2.3,0.8",
+    density: float = 0.15,
+    duplicates: float = 0.3,
+    translated: float = 0.0,
+    seed: int = 1,
+) -> int:
+    rng = random.Random(seed + 1)
+    chars = 0
+    with open(path, "w", encoding="utf-8", newline="") as outfile:
+        writer = csv.writer(outfile, delimiter="\t")
+        writer.writerow(["id", "flags", "source", "translation"])
+        for idx, text in enumerate(generate_texts(rows, length, density, duplicates, seed)):
+            done = rng.random() < translated
+            writer.writerow([f"row_{idx}", "", text, text if done else ""])
+            chars += len(text)
+    return chars
@@ -14,10 +14,12 @@ fi
 
 INPUT_PATH="$1"
 BASENAME="$(basename "$INPUT_PATH" .tsv)"
-OUTPUT_PATH="output/${BASENAME}.uk.tsv"
+TO_LANG="${TRANSLATE_TO_LANG:-uk}"
+OUTPUT_PATH="output/${BASENAME}.{lang}.tsv"
 
 python3 -m pip install -r requirements.txt >/dev/null
 
 python3 scripts/translate_tsv.py \
   --in "$INPUT_PATH" \
-  --out "$OUTPUT_PATH"
+  --out "$OUTPUT_PATH" \
+  --to-lang "$TO_LANG"
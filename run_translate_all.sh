@@ -15,6 +15,8 @@ if [[ ${#FILES[@]} -eq 0 ]]; then
   exit 1
 fi
 
-for file in "${FILES[@]}"; do
-  bash run_translate.sh "$file"
-done
+python3 -m pip install -r requirements.txt >/dev/null
+
+python3 scripts/translate_all.py input \
+  --out-dir output \
+  --to-lang "${TRANSLATE_TO_LANG:-uk}"
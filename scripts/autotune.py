@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from typing import Optional, Protocol
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_BATCH_SIZE = 100
+DEFAULT_BATCH_STEP = 4
+LATENCY_SPIKE_FACTOR = 2.5
+LATENCY_WARMUP_SAMPLES = 5
+LATENCY_SMOOTHING = 0.2
+
+
+class Limits(Protocol):
+    # What the engine reads before each dispatch and reports every response to.
+    concurrency: int
+    batch_size: int
+    max_concurrency: int
+
+    def observe(self, status: int, started: float, latency: float) -> None: ...
+
+    def describe(self) -> str: ...
+
+
+class FixedLimits:
+    def __init__(self, concurrency: int, batch_size: int) -> None:
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = self.concurrency
+
+    def observe(self, status: int, started: float, latency: float) -> None:
+        pass
+
+    def describe(self) -> str:
+        return f"concurrency {self.concurrency}, batch size {self.batch_size} (fixed)"
+
+
+class AimdController:
+    def __init__(
+        self,
+        concurrency: int,
+        batch_size: int,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        batch_step: int = DEFAULT_BATCH_STEP,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_batch_size = max(1, max_batch_size)
+        self.concurrency = min(max(1, concurrency), self.max_concurrency)
+        self.batch_size = min(max(1, batch_size), self.max_batch_size)
+        self.batch_step = max(1, batch_step)
+        self.baseline: Optional[float] = None
+        self.samples = 0
+        self.successes = 0
+        self.increases = 0
+        self.decreases = 0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, status: int, started: float, latency: float) -> None:
+        with self.lock:
+            if status == 429:
+                self._decrease(started, "429 throttled")
+                return
+            if status >= 500:
+                self._decrease(started, f"{status} server error")
+                return
+            if status >= 400:
+                return
+            spike = (
+                self.baseline is not None
+                and self.samples >= LATENCY_WARMUP_SAMPLES
+                and latency > self.baseline * LATENCY_SPIKE_FACTOR
+            )
+            if spike:
+                self._decrease(started, f"latency {latency:.2f}s vs baseline {self.baseline:.2f}s")
+                return
+            self.samples += 1
+            if self.baseline is None:
+                self.baseline = latency
+            else:
+                self.baseline += LATENCY_SMOOTHING * (latency - self.baseline)
+            self.successes += 1
+            if self.successes >= self.concurrency:
+                self.successes = 0
+                self._increase()
+
+    def _increase(self) -> None:
+        concurrency = min(self.concurrency + 1, self.max_concurrency)
+        batch_size = min(self.batch_size + self.batch_step, self.max_batch_size)
+        if (concurrency, batch_size) == (self.concurrency, self.batch_size):
+            return
+        self.increases += 1
+        self._log(concurrency, batch_size, "fast 2xx responses")
+
+    def _decrease(self, started: float, reason: str) -> None:
+        # Responses to requests sent before the last cut reflect the old limits.
+        if started < self.last_decrease:
+            return
+        self.last_decrease = time.monotonic()
+        self.successes = 0
+        self.decreases += 1
+        self._log(max(1, self.concurrency // 2), max(1, self.batch_size // 2), reason)
+
+    def _log(self, concurrency: int, batch_size: int, reason: str) -> None:
+        print(
+            f"Autotune: concurrency {self.concurrency} -> {concurrency}, "
+            f"batch size {self.batch_size} -> {batch_size} ({reason})",
+            file=sys.stderr,
+        )
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+    def describe(self) -> str:
+        return (
+            f"concurrency {self.concurrency}, batch size {self.batch_size} "
+            f"({self.increases} increases, {self.decreases} decreases)"
+        )
@@ -0,0 +1,122 @@
+from bisect import bisect_right
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Tuple, Union
+from urllib.parse import urlparse
+
+MAX_CHARS_PER_REQUEST = 9000
+PACKING_MODES = ("ffd", "sequential")
+DEFAULT_PACKING = "ffd"
+
+
+class RequestLimits(NamedTuple):
+    max_elements: int
+    max_chars: int
+
+
+# Translator v3 accepts up to 1000 array elements and 50,000 characters per request.
+AZURE_REQUEST_LIMITS = RequestLimits(1000, 50_000)
+ENDPOINT_LIMITS: Dict[str, RequestLimits] = {
+    "api.cognitive.microsofttranslator.com": AZURE_REQUEST_LIMITS,
+    "api-eur.cognitive.microsofttranslator.com": AZURE_REQUEST_LIMITS,
+    "api-nam.cognitive.microsofttranslator.com": AZURE_REQUEST_LIMITS,
+    "api-apc.cognitive.microsofttranslator.com": AZURE_REQUEST_LIMITS,
+}
+
+
+def limits_for_endpoint(endpoint: str) -> RequestLimits:
+    return ENDPOINT_LIMITS.get(urlparse(endpoint).hostname or "", AZURE_REQUEST_LIMITS)
+
+
+class BatchQueue:
+    def __init__(self, texts: List[str], max_chars: int = MAX_CHARS_PER_REQUEST) -> None:
+        self.texts = texts
+        self.max_chars = max_chars
+        self.position = 0
+
+    def next_batch(self, batch_size: int) -> List[int]:
+        batch: List[int] = []
+        batch_chars = 0
+        while self.position < len(self.texts):
+            length = len(self.texts[self.position])
+            if batch and (len(batch) >= batch_size or batch_chars + length > self.max_chars):
+                break
+            batch.append(self.position)
+            batch_chars += length
+            self.position += 1
+        return batch
+
+
+class PackingQueue:
+    # First-fit decreasing, filling one request at a time: scanning the
+    # remaining texts longest-first and taking every one that still fits
+    # places each text exactly where FFD would. Texts are bucketed by
+    # length so a request costs O(distinct lengths), not O(texts).
+    def __init__(self, texts: List[str], max_chars: int) -> None:
+        self.max_chars = max_chars
+        self.buckets: Dict[int, Deque[int]] = {}
+        for idx, text in enumerate(texts):
+            self.buckets.setdefault(max(1, len(text)), deque()).append(idx)
+        self.lengths = sorted(self.buckets)
+
+    def next_batch(self, batch_size: int) -> List[int]:
+        batch: List[int] = []
+        remaining = self.max_chars
+        i = bisect_right(self.lengths, remaining) - 1
+        while i >= 0 and len(batch) < batch_size:
+            length = self.lengths[i]
+            bucket = self.buckets[length]
+            take = min(len(bucket), remaining // length, batch_size - len(batch))
+            for _ in range(take):
+                batch.append(bucket.popleft())
+            remaining -= take * length
+            if not bucket:
+                del self.buckets[length]
+                self.lengths.pop(i)
+            i = min(i - 1, bisect_right(self.lengths, remaining) - 1)
+        if not batch and self.lengths:
+            # Oversized texts still go out, one per request.
+            length = self.lengths[-1]
+            bucket = self.buckets[length]
+            batch.append(bucket.popleft())
+            if not bucket:
+                del self.buckets[length]
+                self.lengths.pop()
+        return batch
+
+
+class RoundRobinQueue:
+    def __init__(self, queues: List[Union[BatchQueue, PackingQueue]], sizes: List[int]) -> None:
+        self.queues = queues
+        self.offsets: List[int] = []
+        total = 0
+        for size in sizes:
+            self.offsets.append(total)
+            total += size
+        self.active = [idx for idx, size in enumerate(sizes) if size]
+        self.cursor = 0
+
+    def next_batch(self, batch_size: int) -> List[int]:
+        while self.active:
+            self.cursor %= len(self.active)
+            queue_idx = self.active[self.cursor]
+            batch = self.queues[queue_idx].next_batch(batch_size)
+            if not batch:
+                self.active.pop(self.cursor)
+                continue
+            self.cursor += 1
+            offset = self.offsets[queue_idx]
+            return [offset + position for position in batch]
+        return []
+
+    def locate(self, batch: List[int]) -> Tuple[int, List[int]]:
+        # Empty queues share their offset with the next one; bisect_right skips them.
+        queue_idx = bisect_right(self.offsets, batch[0]) - 1
+        offset = self.offsets[queue_idx]
+        return queue_idx, [position - offset for position in batch]
+
+
+def make_queue(texts: List[str], packing: str, max_chars: int) -> Union[BatchQueue, PackingQueue]:
+    if packing == "ffd":
+        return PackingQueue(texts, max_chars)
+    return BatchQueue(texts, max_chars)
+
@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from autotune import Limits
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY = 1
+
+
+def run_batches(
+    next_batch: Callable[[int], List[int]],
+    send: Callable[[List[int]], T],
+    on_result: Callable[[List[int], T], None],
+    limits: Limits,
+) -> None:
+    asyncio.run(_run_batches(next_batch, send, on_result, limits))
+
+
+async def _run_batches(
+    next_batch: Callable[[int], List[int]],
+    send: Callable[[List[int]], T],
+    on_result: Callable[[List[int], T], None],
+    limits: Limits,
+) -> None:
+    loop = asyncio.get_running_loop()
+    in_flight: Dict[asyncio.Future, List[int]] = {}
+    failure: Optional[BaseException] = None
+    exhausted = False
+
+    executor = ThreadPoolExecutor(max_workers=limits.max_concurrency)
+    try:
+        while True:
+            while not exhausted and len(in_flight) < limits.concurrency:
+                batch = next_batch(limits.batch_size)
+                if not batch:
+                    exhausted = True
+                    break
+                in_flight[loop.run_in_executor(executor, send, batch)] = batch
+            if not in_flight:
+                break
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    if failure is None:
+                        failure = exc
+                    continue
+                on_result(batch, result)
+            if failure is not None:
+                raise failure
+    except BaseException:
+        # Cancelled (Ctrl-C) or failed: do not wait for senders still sleeping in backoffs.
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
@@ -0,0 +1,52 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def journal_path_for(output_path: str) -> str:
+    return output_path + JOURNAL_SUFFIX
+
+
+def replay_journal(path: str) -> Dict[int, Tuple[str, str]]:
+    entries: Dict[int, Tuple[str, str]] = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as infile:
+        for line in infile:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A run killed mid-write leaves a truncated last line.
+                continue
+            entries[entry["row"]] = (entry["id"], entry["text"])
+    return entries
+
+
+class Journal:
+    def __init__(self, path: str, resume: bool = False) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        needs_newline = False
+        if resume and os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                needs_newline = existing.read(1) != b"\n"
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+        if needs_newline:
+            self.file.write("\n")
+
+    def append(self, entries: List[Tuple[int, str, str]]) -> None:
+        if not entries:
+            return
+        for row, row_id, text in entries:
+            self.file.write(json.dumps({"row": row, "id": row_id, "text": text}, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def discard(self) -> None:
+        self.close()
+        os.remove(self.path)
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_MEMORY_PATH = "cache/translation_memory.sqlite"
+LOOKUP_CHUNK = 500
+
+
+class TranslationMemory:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            " from_lang TEXT NOT NULL,"
+            " to_lang TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " PRIMARY KEY (from_lang, to_lang, source))"
+        )
+        self.conn.commit()
+
+    def lookup(self, from_lang: str, to_lang: str, sources: Iterable[str]) -> Dict[str, str]:
+        unique = list(dict.fromkeys(sources))
+        found: Dict[str, str] = {}
+        for start in range(0, len(unique), LOOKUP_CHUNK):
+            chunk = unique[start : start + LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            cursor = self.conn.execute(
+                "SELECT source, translation FROM memory"
+                f" WHERE from_lang = ? AND to_lang = ? AND source IN ({marks})",
+                [from_lang, to_lang, *chunk],
+            )
+            # Empty translations of non-empty sources may predate the store() check.
+            found.update(
+                (source, translation) for source, translation in cursor if translation.strip() or not source.strip()
+            )
+        return found
+
+    def store(self, from_lang: str, to_lang: str, pairs: List[Tuple[str, str]]) -> None:
+        pairs = [(source, translation) for source, translation in pairs if translation.strip() or not source.strip()]
+        if not pairs:
+            return
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO memory (from_lang, to_lang, source, translation) VALUES (?, ?, ?, ?)",
+            [(from_lang, to_lang, source, translation) for source, translation in pairs],
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
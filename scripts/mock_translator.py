@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import random
+import re
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from batching import AZURE_REQUEST_LIMITS
+
+LATENCY_KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+NOTRANSLATE_SPAN_RE = re.compile(r'(<span class="notranslate">.*?</span>)')
+TOKEN_RE = re.compile(r"__PH(\d+)__")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Azure Translator v3 /translate endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency",
+        default="fixed:0.05",
+        help="Seconds per request: fixed:S, uniform:LO,HI, normal:MEAN,SD, lognormal:MU,SIGMA or exponential:MEAN.",
+    )
+    parser.add_argument("--latency-per-char", type=float, default=0.0, help="Extra seconds per billed character.")
+    parser.add_argument("--chars-per-minute", type=float, default=0.0, help="Character quota; 0 disables it.")
+    parser.add_argument("--total-chars", type=int, default=0, help="Hard quota for the server's lifetime (403 after).")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After for random 429s.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 5xx.")
+    parser.add_argument("--corrupt-rate", type=float, default=0.0, help="Share of texts whose __PHn__ tokens break.")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="Share of texts translated to an empty string.")
+    parser.add_argument("--max-elements", type=int, default=AZURE_REQUEST_LIMITS.max_elements)
+    parser.add_argument("--max-chars", type=int, default=AZURE_REQUEST_LIMITS.max_chars)
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args()
+
+
+def make_latency(spec: str) -> Callable[[random.Random], float]:
+    kind, _, raw = spec.partition(":")
+    try:
+        values = [float(value) for value in raw.split(",") if value]
+    except ValueError:
+        values = []
+    if kind not in LATENCY_KINDS or len(values) != (1 if kind in ("fixed", "exponential") else 2):
+        raise ValueError(f"Bad latency spec: {spec}")
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+
+
+class CharQuota:
+    # Same shape as Azure's per-minute character limit: a bucket that holds one
+    # minute of characters and refills continuously.
+    def __init__(self, chars_per_minute: float) -> None:
+        self.capacity = chars_per_minute
+        self.rate = chars_per_minute / 60.0
+        self.tokens = chars_per_minute
+        self.updated = time.monotonic()
+
+    def take(self, chars: int) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if chars <= self.tokens:
+            self.tokens -= chars
+            return 0.0
+        return (min(chars, self.capacity) - self.tokens) / self.rate
+
+
+class MockState:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.latency = make_latency(args.latency)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.quota = CharQuota(args.chars_per_minute) if args.chars_per_minute > 0 else None
+        self.counters: Dict[str, int] = {
+            "requests": 0,
+            "translated": 0,
+            "texts": 0,
+            "chars": 0,
+            "throttled": 0,
+            "errors": 0,
+            "rejected": 0,
+        }
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+    def decide(self, chars: int) -> Tuple[Optional[int], float]:
+        # Returns (error status or None, Retry-After seconds).
+        args = self.args
+        with self.lock:
+            roll = self.rng.random()
+            if roll < args.error_rate:
+                return self.rng.choice((500, 503)), 0.0
+            if roll < args.error_rate + args.throttle_rate:
+                return 429, args.retry_after
+            if args.total_chars and self.counters["chars"] + chars > args.total_chars:
+                return 403, 0.0
+            if self.quota is not None:
+                wait = self.quota.take(chars)
+                if wait > 0:
+                    return 429, wait
+            self.counters["chars"] += chars
+            return None, 0.0
+
+    def delay(self, chars: int) -> float:
+        with self.lock:
+            return self.latency(self.rng) + chars * self.args.latency_per_char
+
+    def corrupt(self, text: str) -> str:
+        with self.lock:
+            if self.rng.random() >= self.args.corrupt_rate:
+                return text
+        # The engine treats notranslate spans as opaque, like Azure does.
+        parts = NOTRANSLATE_SPAN_RE.split(text)
+        for pos in range(0, len(parts), 2):
+            parts[pos] = TOKEN_RE.sub(r"__ PH\1 __", parts[pos])
+        return "".join(parts)
+
+
+def translate_text(state: MockState, text: str, lang: str) -> str:
+    if state.args.empty_rate:
+        with state.lock:
+            if state.rng.random() < state.args.empty_rate:
+                return ""
+    return f"[{lang}] {state.corrupt(text)}"
+
+
+def error_body(code: int, message: str) -> bytes:
+    return json.dumps({"error": {"code": code, "message": message}}).encode("utf-8")
+
+
+class TranslatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MockState
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def send_json(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path == "/stats":
+            self.send_json(200, json.dumps(self.state.snapshot()).encode("utf-8"))
+            return
+        self.send_json(404, error_body(404000, "Not found."))
+
+    def do_POST(self) -> None:
+        state = self.state
+        state.count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.rstrip("/") != "/translate":
+            self.send_json(404, error_body(404000, "Not found."))
+            return
+        if query.get("api-version") != ["3.0"]:
+            state.count("rejected")
+            self.send_json(400, error_body(400021, "The API version parameter is missing or invalid."))
+            return
+        if not self.headers.get("Ocp-Apim-Subscription-Key"):
+            state.count("rejected")
+            self.send_json(401, error_body(401000, "Missing subscription key."))
+            return
+        to_langs = [lang for value in query.get("to", []) for lang in value.split(",") if lang]
+        if not to_langs:
+            state.count("rejected")
+            self.send_json(400, error_body(400036, "The target language is not valid."))
+            return
+        text_type = (query.get("textType") or ["plain"])[0]
+        if text_type not in ("plain", "html"):
+            state.count("rejected")
+            self.send_json(400, error_body(400064, "The textType parameter is invalid."))
+            return
+        try:
+            body = json.loads(raw or b"null")
+            texts: List[str] = [item["text"] for item in body]
+        except (ValueError, TypeError, KeyError):
+            state.count("rejected")
+            self.send_json(400, error_body(400074, "The body of the request is not valid JSON."))
+            return
+        if len(texts) > state.args.max_elements:
+            state.count("rejected")
+            self.send_json(400, error_body(400077, "The maximum request size has been exceeded."))
+            return
+        if sum(len(text) for text in texts) > state.args.max_chars:
+            state.count("rejected")
+            self.send_json(400, error_body(400050, "The input text is too long."))
+            return
+
+        # Azure bills every target language separately.
+        chars = sum(len(text) for text in texts) * len(to_langs)
+        time.sleep(state.delay(chars))
+        status, retry_after = state.decide(chars)
+        if status == 429:
+            state.count("throttled")
+            self.send_json(
+                429,
+                error_body(429001, "The server rejected the request because the client has exceeded request limits."),
+                {"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+            return
+        if status == 403:
+            state.count("rejected")
+            self.send_json(403, error_body(403001, "The operation is not allowed because the quota is exceeded."))
+            return
+        if status is not None:
+            state.count("errors")
+            self.send_json(status, error_body(status * 1000, "The service is temporarily unavailable."))
+            return
+
+        detect = "from" not in query
+        results = []
+        for text in texts:
+            item: Dict[str, object] = {
+                "translations": [{"text": translate_text(state, text, lang), "to": lang} for lang in to_langs]
+            }
+            if detect:
+                item["detectedLanguage"] = {"language": "en", "score": 1.0}
+            results.append(item)
+        state.count("translated")
+        state.count("texts", len(texts))
+        self.send_json(200, json.dumps(results, ensure_ascii=False).encode("utf-8"))
+
+
+def stop(signum: int, frame: object) -> None:
+    raise KeyboardInterrupt
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        state = MockState(args)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+    TranslatorHandler.state = state
+    server = ThreadingHTTPServer((args.host, args.port), TranslatorHandler)
+    server.daemon_threads = True
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Mock translator listening on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        counters = state.snapshot()
+        print("Mock translator summary")
+        for name, value in counters.items():
+            print(f"{name}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,3 +1,4 @@
+import html
 import re
 from typing import List, Tuple
 
@@ -8,26 +9,104 @@ PLACEHOLDER_PATTERN = re.compile(
     r"|(\{[^}]+\})"  # brace tokens
     r"|(<[^>]+>)"  # XML/HTML tags
 )
+# The same alternatives in a single group for split(); the two percent forms
+# share their prefix. Matches are identical to PLACEHOLDER_PATTERN's.
+PLACEHOLDER_SCAN_RE = re.compile(r"(\\[nt]|%(?:[A-Z][A-Z0-9_]+|[-+0-9.#]*[a-zA-Z])|\{[^}]+\}|<[^>]+>)")
 
 PH_RE = re.compile(r"__PH\d+__")
+PH_SPLIT_RE = re.compile(r"__PH(\d+)__")
+PH_RUN_RE = re.compile(r"(__PH\d+__(?:\s*__PH\d+__)*)")
+SEGMENT_RE = re.compile(r"(\s*(?:__PH\d+__\s*)+)")
+# Engines reorder attributes and add spaces inside the tags and around the
+# placeholders. Spans wrap a run that starts and ends with a placeholder, so
+# whitespace just inside them was added by the engine and is dropped.
+NOTRANSLATE_RE = re.compile(
+    r"<span\b[^>]*\bclass\s*=\s*[\"']?(?:[^\"'>]*\s)?notranslate\b[^>]*>"
+    r"\s*((?:__PH\d+__\s*)*__PH\d+__)\s*</span\s*>",
+    re.IGNORECASE,
+)
+# Masked sources hold no tags (tags are placeholders), so a span left in a
+# translation is notranslate markup that unwrap_notranslate() did not take off.
+LEFTOVER_SPAN_RE = re.compile(r"</?\s*span\b[^>]*>", re.IGNORECASE)
 
+# restore_placeholders() uses one str.replace per placeholder while that costs
+# less than a regex split: each replace rescans the text, so the loop's cost is
+# placeholders x length, and this is about where the two meet. The loop is only
+# safe while no placeholder itself contains "__PH", which a later replace would
+# rewrite; such lists always take the split.
+RESTORE_LOOP_MAX_COST = 4000
 
-def mask_placeholders(text: str) -> Tuple[str, List[str]]:
-    placeholders: List[str] = []
+MASK_MODES = ("tokens", "html", "segments")
+DEFAULT_MASK_MODE = "tokens"
+TEXT_TYPES = {"tokens": "plain", "html": "html", "segments": "plain"}
+# Segment mode sends short strings whole, as tokens; html is their fallback too.
+ALTERNATE_MASK_MODES = {"tokens": "html", "html": "tokens", "segments": "html"}
 
-    def repl(match: re.Match) -> str:
-        placeholders.append(match.group(0))
-        return f"__PH{len(placeholders) - 1}__"
 
-    masked = PLACEHOLDER_PATTERN.sub(repl, text)
-    return masked, placeholders
+def mask_placeholders(text: str) -> Tuple[str, List[str]]:
+    # Every placeholder starts with one of these; most strings have none, and
+    # `in` is much cheaper than a regex scan.
+    if "\\" not in text and "%" not in text and "{" not in text and "<" not in text:
+        return text, []
+    parts = PLACEHOLDER_SCAN_RE.split(text)
+    placeholders = parts[1::2]
+    parts[1::2] = [f"__PH{idx}__" for idx in range(len(placeholders))]
+    return "".join(parts), placeholders
 
 
 def restore_placeholders(text: str, placeholders: List[str]) -> str:
-    for idx, token in enumerate(placeholders):
-        text = text.replace(f"__PH{idx}__", token)
-    return text
+    if not placeholders:
+        return text
+    if len(placeholders) * len(text) <= RESTORE_LOOP_MAX_COST and "__PH" not in "".join(placeholders):
+        for idx, token in enumerate(placeholders):
+            text = text.replace(f"__PH{idx}__", token)
+        return text
+    # One scan; odd positions of the split hold the placeholder numbers.
+    parts = PH_SPLIT_RE.split(text)
+    count = len(placeholders)
+    for pos in range(1, len(parts), 2):
+        idx = int(parts[pos])
+        parts[pos] = placeholders[idx] if idx < count else f"__PH{parts[pos]}__"
+    return "".join(parts)
 
 
 def placeholders_match(masked_source: str, masked_translation: str) -> bool:
     return PH_RE.findall(masked_source) == PH_RE.findall(masked_translation)
+
+
+def passes_qa(masked_source: str, masked_translation: str) -> bool:
+    # An empty translation of a non-empty source fails too, placeholders or not,
+    # and so does one with notranslate markup left in it.
+    if not masked_translation.strip() and masked_source.strip():
+        return False
+    if "<" in masked_translation and LEFTOVER_SPAN_RE.search(masked_translation):
+        return False
+    return placeholders_match(masked_source, masked_translation)
+
+
+def wrap_notranslate(masked: str) -> str:
+    # Neighbouring placeholders share one span to keep the markup overhead down.
+    parts = PH_RUN_RE.split(masked)
+    for pos in range(0, len(parts), 2):
+        parts[pos] = html.escape(parts[pos], quote=False)
+    for pos in range(1, len(parts), 2):
+        parts[pos] = f'<span class="notranslate">{parts[pos]}</span>'
+    return "".join(parts)
+
+
+def unwrap_notranslate(text: str) -> str:
+    return html.unescape(NOTRANSLATE_RE.sub(r"\1", text))
+
+
+def encode_masked(masked: str, mode: str) -> str:
+    return wrap_notranslate(masked) if mode == "html" else masked
+
+
+def decode_masked(text: str, mode: str) -> str:
+    return unwrap_notranslate(text) if mode == "html" else text
+
+
+def split_segments(masked: str) -> List[str]:
+    # Even positions hold the text between placeholders, odd positions the
+    # placeholders themselves together with the whitespace around them.
+    return SEGMENT_RE.split(masked)
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+
+class TierLimits(NamedTuple):
+    chars_per_minute: float
+    requests_per_second: float
+
+
+# Azure meters Translator by characters per hour; spread evenly per minute.
+TIER_LIMITS: Dict[str, TierLimits] = {
+    "F0": TierLimits(2_000_000 / 60, 2.0),
+    "S1": TierLimits(40_000_000 / 60, 20.0),
+    "S2": TierLimits(40_000_000 / 60, 20.0),
+    "S3": TierLimits(120_000_000 / 60, 50.0),
+    "S4": TierLimits(200_000_000 / 60, 50.0),
+    "C2": TierLimits(2_500_000 / 60, 10.0),
+    "C3": TierLimits(5_000_000 / 60, 10.0),
+    "C4": TierLimits(10_000_000 / 60, 20.0),
+    "D3": TierLimits(18_000_000 / 60, 20.0),
+}
+DEFAULT_TIER = "F0"
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    def __init__(self, chars_per_minute: float, requests_per_second: float, tier: str = "custom") -> None:
+        self.tier = tier
+        self.chars_per_minute = chars_per_minute
+        self.requests_per_second = requests_per_second
+        self.chars = TokenBucket(chars_per_minute / 60.0, chars_per_minute)
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self.blocked_until = 0.0
+        self.waited = 0.0
+        self.backoffs = 0
+        self.server_errors = 0
+        self.lock = threading.Lock()
+        # Set by stop(): wakes every sender waiting here, so an interrupted run exits at once.
+        self.stopped = threading.Event()
+
+    def acquire(self, chars: int) -> None:
+        with self.lock:
+            now = time.monotonic()
+            delay = max(
+                self.blocked_until - now,
+                self.chars.reserve(chars, now),
+                self.requests.reserve(1, now),
+                0.0,
+            )
+            self.waited += delay
+        if delay > 0:
+            self.stopped.wait(delay)
+        if self.stopped.is_set():
+            raise RuntimeError("Rate limiter stopped")
+
+    def backoff(self, delay: float, throttled: bool = True) -> None:
+        with self.lock:
+            if throttled:
+                self.backoffs += 1
+            else:
+                self.server_errors += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def limiter_for_tier(
+    tier: str,
+    chars_per_minute: Optional[float] = None,
+    requests_per_second: Optional[float] = None,
+) -> RateLimiter:
+    limits = TIER_LIMITS.get(tier.upper())
+    if limits is None:
+        raise ValueError(f"Unknown pricing tier: {tier} (expected one of {', '.join(TIER_LIMITS)})")
+    return RateLimiter(
+        chars_per_minute or limits.chars_per_minute,
+        requests_per_second or limits.requests_per_second,
+        tier=tier.upper(),
+    )
@@ -0,0 +1,59 @@
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class RowTable:
+    __slots__ = ("fieldnames", "columns", "index", "extras", "size")
+
+    def __init__(self, fieldnames: List[str]) -> None:
+        self.fieldnames = list(fieldnames)
+        self.columns: List[List[str]] = [[] for _ in self.fieldnames]
+        self.index: Dict[str, int] = {}
+        for position, name in enumerate(self.fieldnames):
+            self.index.setdefault(name, position)
+        self.extras: Dict[int, List[str]] = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, values: List[str]) -> None:
+        width = len(self.columns)
+        for position, column in enumerate(self.columns):
+            column.append(values[position] if position < len(values) else "")
+        if len(values) > width:
+            self.extras[self.size] = values[width:]
+        self.size += 1
+
+    def column(self, name: str) -> Optional[List[str]]:
+        position = self.index.get(name)
+        if position is None:
+            return None
+        return self.columns[position]
+
+    def replace_column(self, name: str, values: List[str]) -> None:
+        self.columns[self.index[name]] = values
+
+    def iter_rows(self) -> Iterator[Tuple[str, ...]]:
+        if not self.extras:
+            yield from zip(*self.columns)
+            return
+        for idx, values in enumerate(zip(*self.columns)):
+            yield values + tuple(self.extras.get(idx, ()))
+
+    def write(self, writer: Any) -> None:
+        writer.writerows(self.iter_rows())
+
+
+def read_tables(reader: Iterable[List[str]], fieldnames: List[str], size: Optional[int] = None) -> Iterator[RowTable]:
+    # Blank lines are dropped, matching csv.DictReader.
+    values = (row for row in reader if row)
+    while True:
+        table = RowTable(fieldnames)
+        for row in islice(values, size):
+            table.append(row)
+        if not len(table):
+            return
+        yield table
+        if size is None:
+            return
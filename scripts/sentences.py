@@ -0,0 +1,60 @@
+import re
+from typing import Callable, List, Pattern
+
+from placeholders import PH_RE
+
+SENTENCE_END_RE = re.compile(r"[.!?…。！？]+[\"'»”’)\]]*(\s+)")
+WORD_GAP_RE = re.compile(r"(\s+)")
+
+
+def split_at(text: str, pattern: Pattern[str]) -> List[str]:
+    # Even positions hold pieces of text, odd positions the gaps between them.
+    parts: List[str] = []
+    start = 0
+    for match in pattern.finditer(text):
+        parts.append(text[start : match.start(1)])
+        parts.append(match.group(1))
+        start = match.end(1)
+    parts.append(text[start:])
+    return parts
+
+
+def hard_split(text: str, max_chars: int) -> List[str]:
+    # Last resort for runs without whitespace; never cuts through a placeholder.
+    tokens = [match.span() for match in PH_RE.finditer(text)]
+    parts: List[str] = []
+    start = 0
+    while len(text) - start > max_chars:
+        cut = start + max_chars
+        for token_start, token_end in tokens:
+            if token_start < cut < token_end and token_start > start:
+                cut = token_start
+        parts.extend([text[start:cut], ""])
+        start = cut
+    parts.append(text[start:])
+    return parts
+
+
+def split_long_text(text: str, max_chars: int, measure: Callable[[str], int] = len) -> List[str]:
+    # Splits at sentence ends, then at whitespace, then anywhere, and packs the
+    # pieces back greedily so each stays within max_chars. The result keeps the
+    # split_at layout, so "".join() of it gives back the original text.
+    parts: List[str] = []
+    for pos, sentence in enumerate(split_at(text, SENTENCE_END_RE)):
+        if pos % 2 or measure(sentence) <= max_chars:
+            parts.append(sentence)
+            continue
+        for word_pos, word in enumerate(split_at(sentence, WORD_GAP_RE)):
+            if word_pos % 2 or measure(word) <= max_chars:
+                parts.append(word)
+            else:
+                parts.extend(hard_split(word, max_chars))
+
+    packed = [parts[0]]
+    for pos in range(1, len(parts), 2):
+        candidate = packed[-1] + parts[pos] + parts[pos + 1]
+        if measure(candidate) <= max_chars:
+            packed[-1] = candidate
+        else:
+            packed.extend(parts[pos : pos + 2])
+    return packed
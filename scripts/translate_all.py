@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import glob
+import os
+import sys
+import time
+from typing import List
+
+from translate_tsv import (
+    FileRun,
+    add_common_arguments,
+    build_context,
+    print_mask_summary,
+    print_repair_summary,
+    print_transport_summary,
+    report_failure,
+    run_files,
+    write_stats_json,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Translate many TSV files through one shared worker pool.")
+    parser.add_argument("inputs", nargs="+", help="Directories (all *.tsv inside) or glob patterns.")
+    parser.add_argument("--out-dir", default="output")
+    parser.add_argument("--no-global-dedupe", action="store_true")
+    add_common_arguments(parser)
+    return parser.parse_args()
+
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    paths: List[str] = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, "*.tsv"))))
+        else:
+            paths.extend(sorted(glob.glob(pattern)))
+    return list(dict.fromkeys(paths))
+
+
+def output_template(input_path: str, out_dir: str) -> str:
+    basename = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(out_dir, f"{basename}.{{lang}}.tsv")
+
+
+def rate(amount: float, seconds: float) -> float:
+    return amount / seconds if seconds > 0 else 0.0
+
+
+def main() -> int:
+    args = parse_args()
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("ERROR: No TSV files found.", file=sys.stderr)
+        return 1
+    try:
+        context = build_context(args)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+    failed = False
+    started = time.monotonic()
+    with contextlib.closing(context):
+        runs: List[FileRun] = []
+        for path in paths:
+            try:
+                runs.append(FileRun(path, output_template(path, args.out_dir), context))
+            except (OSError, ValueError) as exc:
+                print(f"ERROR: {exc}", file=sys.stderr)
+                failed = True
+        try:
+            saved_chars = run_files(runs, context, global_dedupe=not args.no_global_dedupe)
+        except (Exception, KeyboardInterrupt) as exc:
+            # Senders still sleeping in the limiter wake up and stop.
+            context.limiter.stop()
+            for run in runs:
+                run.abort()
+            report_failure(exc, runs)
+            return 1
+        elapsed = time.monotonic() - started
+
+        print("Translation summary")
+        for run in runs:
+            stats = run.stats
+            translated = sum(lang_stats.translated_rows for lang_stats in stats.languages.values())
+            qa_failed = sum(lang_stats.qa_failed for lang_stats in stats.languages.values())
+            repaired = sum(lang_stats.repaired_rows for lang_stats in stats.languages.values())
+            print(
+                f"{run.input_path}: {stats.total_rows} rows, {stats.eligible_rows} eligible, "
+                f"{translated} translated ({repaired} after repair), {qa_failed} QA failed in {run.elapsed:.1f}s "
+                f"({rate(stats.eligible_rows, run.elapsed):.1f} rows/s, "
+                f"{rate(stats.chars_sent, run.elapsed):.0f} chars/s)"
+            )
+        total_rows = sum(run.stats.total_rows for run in runs)
+        eligible_rows = sum(run.stats.eligible_rows for run in runs)
+        # Per-file counts include texts another file paid for; subtract the shared ones.
+        chars_sent = sum(run.stats.chars_sent for run in runs) - saved_chars
+        print(f"Files: {len(runs)}")
+        print(f"Total rows: {total_rows}")
+        print(f"Eligible rows: {eligible_rows}")
+        print(f"Characters sent: {chars_sent}")
+        if not args.no_global_dedupe:
+            per_file_chars = chars_sent + saved_chars
+            print(
+                f"Characters saved by cross-file dedupe: {saved_chars} "
+                f"({saved_chars / max(1, per_file_chars):.1%} of {per_file_chars} per-file)"
+            )
+        print(f"Elapsed: {elapsed:.1f}s")
+        print(f"Throughput: {rate(eligible_rows, elapsed):.1f} rows/s, {rate(chars_sent, elapsed):.0f} chars/s")
+        print_mask_summary([run.stats for run in runs])
+        print_repair_summary([run.stats for run in runs], context)
+        print_transport_summary(context)
+        if args.stats_json_path:
+            write_stats_json(args.stats_json_path, runs, context, chars_sent, elapsed)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,32 +1,85 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import csv
+import dataclasses
+import json
 import os
 import random
 import sys
 import time
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import requests
 
-from placeholders import mask_placeholders, placeholders_match, restore_placeholders
+from autotune import DEFAULT_MAX_CONCURRENCY, AimdController, FixedLimits, Limits
+from batching import (
+    DEFAULT_PACKING,
+    MAX_CHARS_PER_REQUEST,
+    PACKING_MODES,
+    RoundRobinQueue,
+    limits_for_endpoint,
+    make_queue,
+)
+from engine import DEFAULT_CONCURRENCY, run_batches
+from journal import Journal, journal_path_for, replay_journal
+from memory import DEFAULT_MEMORY_PATH, TranslationMemory
+from placeholders import (
+    ALTERNATE_MASK_MODES,
+    DEFAULT_MASK_MODE,
+    MASK_MODES,
+    TEXT_TYPES,
+    decode_masked,
+    encode_masked,
+    split_segments,
+)
+from rows import RowTable, read_tables
+from ratelimit import DEFAULT_TIER, RateLimiter, limiter_for_tier
+from sentences import split_long_text
+from transport import DEFAULT_POOL_SIZE, Transport
+from workers import DEFAULT_WORKERS, Masked, WorkerPool
 
 DEFAULT_ENDPOINT = "https://api.cognitive.microsofttranslator.com"
-MAX_CHARS_PER_REQUEST = 9000
 DEFAULT_BATCH_SIZE = 8
-DEFAULT_SLEEP_BETWEEN_BATCHES = 1.0
 DEFAULT_MAX_RETRIES = 12
+RETRY_STATUSES = (500, 502, 503, 504)
+DEFAULT_WINDOW_ROWS = 5000
+DEFAULT_REPAIR_BUDGET = 100_000
+DEFAULT_MIN_SEGMENT_CHARS = 20
+# Leaves room under the usual 1024 descriptor limit for sockets and worker pipes.
+DEFAULT_MAX_OPEN_FILES = 256
+REPAIR_STAGES = ("alternate", "segments")
 
 
 def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Translate TSV source column to Ukrainian.")
+    parser = argparse.ArgumentParser(description="Translate the TSV source column into one or more languages (--to-lang).")
     parser.add_argument("--in", dest="input_path", required=True)
     parser.add_argument("--out", dest="output_path", required=True)
+    add_common_arguments(parser)
+    return parser.parse_args()
+
+
+def add_common_arguments(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--from-lang", default="en")
     parser.add_argument("--to-lang", default="uk")
     parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--packing", choices=PACKING_MODES)
+    parser.add_argument("--mask-mode", choices=MASK_MODES)
+    parser.add_argument("--min-segment-chars", type=int)
+    parser.add_argument("--repair-budget", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--tier")
+    parser.add_argument("--autotune", action="store_true")
+    parser.add_argument("--memory", dest="memory_path")
+    parser.add_argument("--no-memory", action="store_true")
     parser.add_argument("--overwrite", action="store_true")
-    return parser.parse_args()
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--previous", dest="previous_path")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--window", type=int)
+    parser.add_argument("--stats-json", dest="stats_json_path")
 
 
 def env_int(name: str, default: int) -> int:
@@ -50,18 +103,29 @@ def env_float(name: str, default: float) -> float:
 
 
 def post_with_retry(
+    transport: Transport,
     url: str,
     headers: dict,
     payload: list,
     timeout: int = 60,
     params: Optional[dict] = None,
     max_retries: int = DEFAULT_MAX_RETRIES,
+    limiter: Optional[RateLimiter] = None,
+    chars: int = 0,
+    on_attempt: Optional[Callable[[int, float, float], None]] = None,
 ) -> requests.Response:
     base_delay = 1.0
     max_delay = 15.0
     for attempt in range(max_retries):
-        response = requests.post(url, headers=headers, json=payload, timeout=timeout, params=params)
-        if response.status_code == 429:
+        if limiter is not None:
+            limiter.acquire(chars)
+        started = time.monotonic()
+        response = transport.post(url, headers=headers, json=payload, timeout=timeout, params=params)
+        if on_attempt is not None:
+            on_attempt(response.status_code, started, time.monotonic() - started)
+        throttled = response.status_code == 429
+        if throttled or response.status_code in RETRY_STATUSES:
+            # Server errors back off like throttling: every batch waits, not just this one.
             retry_after = response.headers.get("Retry-After")
             if retry_after:
                 try:
@@ -71,7 +135,10 @@ def post_with_retry(
             else:
                 delay = min(max_delay, base_delay * (2**attempt))
             delay += random.uniform(0, 0.5)
-            time.sleep(delay)
+            if limiter is not None:
+                limiter.backoff(delay, throttled)
+            else:
+                time.sleep(delay)
             continue
         response.raise_for_status()
         return response
@@ -80,16 +147,21 @@ def post_with_retry(
 
 
 def translate_batch(
+    transport: Transport,
     endpoint: str,
     key: str,
     region: str,
     from_lang: str,
-    to_lang: str,
+    to_langs: List[str],
     texts: List[str],
     max_retries: int,
-) -> List[str]:
+    limiter: Optional[RateLimiter] = None,
+    on_attempt: Optional[Callable[[int, float, float], None]] = None,
+    text_type: str = "plain",
+) -> Dict[str, List[str]]:
+    translations: Dict[str, List[str]] = {lang: [] for lang in to_langs}
     if not texts:
-        return []
+        return translations
     url = f"{endpoint.rstrip('/')}/translate"
     headers = {
         "Ocp-Apim-Subscription-Key": key,
@@ -97,140 +169,1084 @@ def translate_batch(
         "Content-Type": "application/json",
     }
     body = [{"text": text} for text in texts]
-    params = {"api-version": "3.0", "from": from_lang, "to": to_lang}
+    params = {"api-version": "3.0", "from": from_lang, "to": to_langs}
+    if text_type != "plain":
+        params["textType"] = text_type
     response = post_with_retry(
+        transport,
         url,
         headers,
         body,
         timeout=60,
         max_retries=max_retries,
         params=params,
+        limiter=limiter,
+        # Azure bills every target language separately.
+        chars=sum(len(text) for text in texts) * len(to_langs),
+        on_attempt=on_attempt,
     )
     data = response.json()
-    translations = []
     for item in data:
-        if not item.get("translations"):
-            translations.append("")
-            continue
-        translations.append(item["translations"][0]["text"])
-    if len(translations) != len(texts):
+        # Translations come back in the order of the `to` parameter. Their `to`
+        # codes may be normalized (zh-cn -> zh-Hans), so they are not matched by name.
+        item_translations = item.get("translations") or []
+        if len(item_translations) < len(to_langs):
+            missing = ", ".join(to_langs[len(item_translations) :])
+            raise ValueError(f"Translations missing for {missing}")
+        for lang, translation in zip(to_langs, item_translations):
+            translations[lang].append(translation["text"])
+    if len(data) != len(texts):
         raise ValueError("Unexpected number of translations returned")
     return translations
 
 
-def batched_indices(texts: List[str], batch_size: int) -> List[List[int]]:
-    batches: List[List[int]] = []
-    current: List[int] = []
-    current_chars = 0
+def group_by_text(texts: List[str]) -> Tuple[List[str], List[List[int]]]:
+    positions: Dict[str, List[int]] = {}
     for idx, text in enumerate(texts):
-        length = len(text)
-        if current and (len(current) >= batch_size or current_chars + length > MAX_CHARS_PER_REQUEST):
-            batches.append(current)
-            current = []
-            current_chars = 0
-        current.append(idx)
-        current_chars += length
-    if current:
-        batches.append(current)
-    return batches
+        positions.setdefault(text, []).append(idx)
+    return list(positions), list(positions.values())
 
 
-def main() -> int:
-    args = parse_args()
+def parse_languages(value: str) -> List[str]:
+    return list(dict.fromkeys(lang.strip().lower() for lang in value.split(",") if lang.strip()))
+
+
+def output_path_for(template: str, lang: str, multiple: bool) -> str:
+    if "{lang}" in template:
+        return template.replace("{lang}", lang)
+    if not multiple:
+        return template
+    root, ext = os.path.splitext(template)
+    return f"{root}.{lang}{ext}"
+
+
+@dataclass
+class LanguageStats:
+    translated_rows: int = 0
+    qa_failed: int = 0
+    repaired_rows: int = 0
+    resumed_rows: int = 0
+    reused_rows: int = 0
+    changed_rows: int = 0
+    new_rows: int = 0
+    memory_hits: int = 0
+    memory_misses: int = 0
+
+
+@dataclass
+class MaskStats:
+    texts: int = 0
+    qa_failed: int = 0
+    chars: int = 0
+    wasted_chars: int = 0
+
+
+@dataclass
+class RunStats:
+    total_rows: int = 0
+    eligible_rows: int = 0
+    skipped_rows: int = 0
+    unique_texts: int = 0
+    merged_templates: int = 0
+    chars_sent: int = 0
+    repair_chars: int = 0
+    segment_fallbacks: int = 0
+    split_texts: int = 0
+    languages: Dict[str, LanguageStats] = field(default_factory=dict)
+    mask_modes: Dict[str, MaskStats] = field(default_factory=dict)
+
+    def language(self, lang: str) -> LanguageStats:
+        return self.languages.setdefault(lang, LanguageStats())
+
+    def mask_mode(self, mode: str) -> MaskStats:
+        return self.mask_modes.setdefault(mode, MaskStats())
+
+
+class RepairBudget:
+    def __init__(self, chars: int) -> None:
+        self.total = chars
+        self.remaining = chars
+
+    def take(self, chars: int) -> bool:
+        if chars > self.remaining:
+            return False
+        self.remaining -= chars
+        return True
+
+
+@dataclass
+class TranslateContext:
+    transport: Transport
+    endpoint: str
+    key: str
+    region: str
+    from_lang: str
+    to_langs: List[str]
+    max_retries: int
+    limiter: RateLimiter
+    limits: Limits
+    memory: Optional[TranslationMemory]
+    packing: str = DEFAULT_PACKING
+    mask_mode: str = DEFAULT_MASK_MODE
+    max_chars: int = 0
+    overwrite: bool = False
+    resume: bool = False
+    window_rows: Optional[int] = None
+    max_open_files: int = DEFAULT_MAX_OPEN_FILES
+    min_segment_chars: int = 0
+    repair_budget: RepairBudget = field(default_factory=lambda: RepairBudget(DEFAULT_REPAIR_BUDGET))
+    previous_template: Optional[str] = None
+    workers: WorkerPool = field(default_factory=WorkerPool)
+    batch_latencies: List[float] = field(default_factory=list)
+    journals: Dict[str, Journal] = field(default_factory=dict)
+    resumed: Dict[str, Dict[int, Tuple[str, str]]] = field(default_factory=dict)
+    previous: Dict[str, Dict[str, Tuple[str, str]]] = field(default_factory=dict)
+
+    def close(self) -> None:
+        self.transport.close()
+        self.workers.close()
+        if self.memory is not None:
+            self.memory.close()
+
+
+@dataclass
+class BatchSource:
+    langs: List[str]
+    texts: List[str]
+    on_result: Callable[[List[int], Dict[str, List[str]]], None]
+    mask_mode: str = DEFAULT_MASK_MODE
+
+
+def find_target_column(fieldnames: List[str]) -> Optional[str]:
+    if "translation" in fieldnames:
+        return "translation"
+    if "translated" in fieldnames:
+        return "translated"
+    return None
+
+
+def load_previous(path: str) -> Dict[str, Tuple[str, str]]:
+    previous: Dict[str, Tuple[str, str]] = {}
+    with open(path, "r", encoding="utf-8", newline="") as infile:
+        reader = csv.reader(infile, delimiter="\t")
+        fieldnames = next(reader, None) or []
+        target_column = find_target_column(fieldnames)
+        if "id" not in fieldnames or "source" not in fieldnames or target_column is None:
+            raise ValueError(f"Previous output {path} needs 'id', 'source' and 'translation' columns.")
+        id_pos = fieldnames.index("id")
+        source_pos = fieldnames.index("source")
+        target_pos = fieldnames.index(target_column)
+        width = max(id_pos, source_pos, target_pos) + 1
+        for row in reader:
+            if len(row) < width or not row[id_pos]:
+                continue
+            previous[row[id_pos]] = (row[source_pos].strip(), row[target_pos])
+    return previous
+
+
+class WindowJob:
+    def __init__(
+        self,
+        rows: RowTable,
+        offset: int,
+        target_column: str,
+        context: TranslateContext,
+        stats: RunStats,
+        masks: Optional[Masked] = None,
+    ) -> None:
+        # masks, when given, are mask_placeholders() results for every eligible
+        # row in order, computed ahead by FileRun.
+        self.offset = offset
+        self.context = context
+        self.stats = stats
+        stats.total_rows += len(rows)
+        sources = rows.column("source") or [""] * len(rows)
+        targets = rows.column(target_column) or [""] * len(rows)
+        self.ids = rows.column("id") or [""] * len(rows)
+        self.targets: Dict[str, List[str]] = {lang: list(targets) for lang in context.to_langs}
+        self.indices_to_translate: List[int] = []
+        self.placeholder_lists: List[List[str]] = []
+        self.done: Dict[str, Set[int]] = {lang: set() for lang in context.to_langs}
+        distinct_sources: Set[str] = set()
+        masked_sources: List[str] = []
+        unmasked: List[str] = []
+        eligible = -1
+
+        for idx, (source_text, target_text) in enumerate(zip(sources, targets)):
+            source_text = source_text.strip()
+            target_text = target_text.strip()
+            if not source_text:
+                stats.skipped_rows += 1
+                continue
+            if target_text and not context.overwrite:
+                stats.skipped_rows += 1
+                continue
+            stats.eligible_rows += 1
+            eligible += 1
+            settled_langs = []
+            for lang in context.to_langs:
+                lang_stats = stats.language(lang)
+                entry = context.resumed.get(lang, {}).get(offset + idx)
+                if entry is not None and entry[0] == self.ids[idx]:
+                    self.targets[lang][idx] = entry[1]
+                    lang_stats.translated_rows += 1
+                    lang_stats.resumed_rows += 1
+                    settled_langs.append(lang)
+                    continue
+                if lang not in context.previous:
+                    continue
+                previous = context.previous[lang].get(self.ids[idx])
+                if previous is None:
+                    lang_stats.new_rows += 1
+                elif previous[0] == source_text and previous[1].strip():
+                    self.targets[lang][idx] = previous[1]
+                    lang_stats.translated_rows += 1
+                    lang_stats.reused_rows += 1
+                    settled_langs.append(lang)
+                else:
+                    lang_stats.changed_rows += 1
+            if len(settled_langs) == len(context.to_langs):
+                continue
+            for lang in settled_langs:
+                self.done[lang].add(len(self.indices_to_translate))
+            distinct_sources.add(source_text)
+            self.indices_to_translate.append(idx)
+            if masks is None:
+                unmasked.append(source_text)
+            else:
+                masked_sources.append(masks[0][eligible])
+                self.placeholder_lists.append(masks[1][eligible])
+        if masks is None:
+            masked_sources, self.placeholder_lists = context.workers.mask(unmasked)
+
+        self.unique_sources, self.fanout = group_by_text(masked_sources)
+        stats.unique_texts += len(self.unique_sources)
+        stats.merged_templates += len(distinct_sources) - len(self.unique_sources)
+
+        whole_units = list(range(len(self.unique_sources)))
+        segment_groups: Dict[Tuple[str, ...], List[int]] = {}
+        mode = context.mask_mode
+        if mode == "segments":
+            # Strings whose pieces are too short to carry context, or that have
+            # no placeholders at all, are still sent whole.
+            mode = "tokens"
+            whole_units = []
+            for u, masked in enumerate(self.unique_sources):
+                parts = split_segments(masked)
+                if len(parts) == 1:
+                    whole_units.append(u)
+                    continue
+                if any(0 < len(part) < context.min_segment_chars for part in parts[0::2]):
+                    whole_units.append(u)
+                    stats.segment_fallbacks += 1
+                    continue
+                langs = tuple(lang for lang in context.to_langs if self.pending_rows(lang, u))
+                segment_groups.setdefault(langs, []).append(u)
+
+        missing: List[List[str]] = [[] for _ in self.unique_sources]
+        memory = context.memory
+        for lang in context.to_langs:
+            needed = [u for u in whole_units if self.pending_rows(lang, u)]
+            remembered: Dict[str, str] = {}
+            if memory is not None:
+                remembered = memory.lookup(
+                    context.from_lang, lang, [encode_masked(self.unique_sources[u], mode) for u in needed]
+                )
+            hits = []
+            for u in needed:
+                masked_translation = remembered.get(encode_masked(self.unique_sources[u], mode))
+                if masked_translation is None:
+                    missing[u].append(lang)
+                    if memory is not None:
+                        stats.language(lang).memory_misses += len(self.pending_rows(lang, u))
+                    continue
+                hits.append((u, decode_masked(masked_translation, mode)))
+            stats.language(lang).memory_hits += self.apply_translations(lang, hits)
+
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for u, unit_langs in enumerate(missing):
+            if unit_langs:
+                groups.setdefault(tuple(unit_langs), []).append(u)
+        self.sources = [self.make_source(list(langs), units, mode) for langs, units in groups.items()]
+        for langs, units in segment_groups.items():
+            self.sources.extend(self.make_segment_sources(list(langs), units))
+        self.remaining = sum(len(source.texts) for source in self.sources)
+        self.failed: Dict[str, List[int]] = {lang: [] for lang in context.to_langs}
+        self.repair_stage = 0
+        self.on_complete: Optional[Callable[[], None]] = None
+
+    def pending_rows(self, lang: str, unique_idx: int) -> List[int]:
+        done = self.done[lang]
+        return [i for i in self.fanout[unique_idx] if i not in done]
+
+    def apply_translations(
+        self,
+        lang: str,
+        translations: List[Tuple[int, str]],
+        journal_entries: Optional[List[Tuple[int, str, str]]] = None,
+    ) -> int:
+        # Restores (unique_idx, masked_translation) pairs into every pending row
+        # they stand for; returns the number of rows written.
+        row_indices: List[int] = []
+        items: List[Tuple[int, List[str]]] = []
+        for t, (unique_idx, _) in enumerate(translations):
+            for i in self.pending_rows(lang, unique_idx):
+                row_indices.append(self.indices_to_translate[i])
+                items.append((t, self.placeholder_lists[i]))
+        restored_texts = self.context.workers.restore([text for _, text in translations], items)
+        targets = self.targets[lang]
+        for row_idx, restored in zip(row_indices, restored_texts):
+            targets[row_idx] = restored
+            if journal_entries is not None:
+                journal_entries.append((self.offset + row_idx, self.ids[row_idx], restored))
+        self.stats.language(lang).translated_rows += len(row_indices)
+        return len(row_indices)
+
+    def settle(self, count: int) -> None:
+        self.remaining -= count
+        if self.remaining == 0 and not any(self.failed.values()) and self.on_complete is not None:
+            self.on_complete()
+
+    def store(self, lang: str, pairs: List[Tuple[str, str]]) -> None:
+        context = self.context
+        if context.memory is None or not pairs:
+            return
+        mode = context.mask_mode
+        context.memory.store(
+            context.from_lang,
+            lang,
+            [(encode_masked(masked, mode), encode_masked(translation, mode)) for masked, translation in pairs],
+        )
+
+    def make_source(self, langs: List[str], units: List[int], mode: str, repair: bool = False) -> BatchSource:
+        context = self.context
+        mask_stats = self.stats.mask_mode(mode)
+        limit = chars_per_request(context, len(langs))
+        texts: List[str] = []
+        owners: List[Tuple[int, int]] = []
+        layouts: Dict[int, List[str]] = {}
+        for u in units:
+            wire = encode_masked(self.unique_sources[u], mode)
+            if len(wire) <= limit:
+                texts.append(wire)
+                owners.append((u, -1))
+                continue
+            # Oversized texts travel as pieces in the normal batches and are
+            # joined back once every piece has returned.
+            layout = split_long_text(self.unique_sources[u], limit, lambda text: len(encode_masked(text, mode)))
+            layouts[u] = layout
+            if not repair:
+                self.stats.split_texts += 1
+            for pos in range(0, len(layout), 2):
+                texts.append(encode_masked(layout[pos], mode))
+                owners.append((u, pos))
+        collected: Dict[Tuple[str, int], Dict[int, Optional[str]]] = {}
+
+        def masked_source_at(position: int) -> str:
+            unique_idx, pos = owners[position]
+            return self.unique_sources[unique_idx] if pos < 0 else layouts[unique_idx][pos]
+
+        def on_result(batch: List[int], translations: Dict[str, List[str]]) -> None:
+            masked_sources = [masked_source_at(position) for position in batch]
+            for lang in langs:
+                lang_stats = self.stats.language(lang)
+                passed = []
+                accepted: List[Tuple[int, str]] = []
+                masked_translations = [decode_masked(text, mode) for text in translations[lang]]
+                matches = context.workers.check(masked_sources, masked_translations)
+                for position, masked_source, masked_translation, matched in zip(
+                    batch, masked_sources, masked_translations, matches
+                ):
+                    unique_idx, pos = owners[position]
+                    mask_stats.texts += 1
+                    mask_stats.chars += len(texts[position])
+                    if not matched:
+                        mask_stats.qa_failed += 1
+                        mask_stats.wasted_chars += len(texts[position])
+                    if pos >= 0:
+                        layout = layouts[unique_idx]
+                        pieces = collected.setdefault((lang, unique_idx), {})
+                        pieces[pos] = masked_translation if matched else None
+                        if len(pieces) < (len(layout) + 1) // 2:
+                            continue
+                        del collected[(lang, unique_idx)]
+                        joined: List[str] = []
+                        for k, part in enumerate(layout):
+                            piece = pieces[k] if k % 2 == 0 else part
+                            if piece is None:
+                                break
+                            joined.append(piece)
+                        matched = len(joined) == len(layout)
+                        if matched:
+                            masked_source = self.unique_sources[unique_idx]
+                            masked_translation = "".join(joined)
+                    if not matched:
+                        self.failed[lang].append(unique_idx)
+                        continue
+                    if repair:
+                        lang_stats.repaired_rows += len(self.pending_rows(lang, unique_idx))
+                    accepted.append((unique_idx, masked_translation))
+                    passed.append((masked_source, masked_translation))
+                journal_entries: List[Tuple[int, str, str]] = []
+                self.apply_translations(lang, accepted, journal_entries)
+                context.journals[lang].append(journal_entries)
+                self.store(lang, passed)
+            chars = sum(len(texts[position]) for position in batch) * len(langs)
+            self.stats.chars_sent += chars
+            if repair:
+                self.stats.repair_chars += chars
+            self.settle(len(batch))
+
+        return BatchSource(langs, texts, on_result, mode)
+
+    def segment_layout(self, unique_idx: int, limit: int, repair: bool) -> List[str]:
+        parts = split_segments(self.unique_sources[unique_idx])
+        layout: List[str] = []
+        for pos, part in enumerate(parts):
+            if pos % 2 == 0 and len(part) > limit:
+                layout.extend(split_long_text(part, limit))
+            else:
+                layout.append(part)
+        if len(layout) > len(parts) and not repair:
+            self.stats.split_texts += 1
+        return layout
+
+    def make_segment_sources(self, langs: List[str], units: List[int], repair: bool = False) -> List[BatchSource]:
+        # Only the text between placeholders is sent, so the engine never sees
+        # a token it could break; the placeholders are put back verbatim.
+        # Segments are deduped and remembered on their own.
+        context = self.context
+        limit = chars_per_request(context, len(langs))
+        parts_by_unit = {u: self.segment_layout(u, limit, repair) for u in units}
+        segment_owners: Dict[str, List[Tuple[int, int]]] = {}
+        waiting_counts = dict.fromkeys(units, 0)
+        for u, parts in parts_by_unit.items():
+            for pos in range(0, len(parts), 2):
+                if parts[pos]:
+                    segment_owners.setdefault(parts[pos], []).append((u, pos))
+                    waiting_counts[u] += 1
+        pieces = {lang: {u: list(parts) for u, parts in parts_by_unit.items()} for lang in langs}
+        waiting = {lang: dict(waiting_counts) for lang in langs}
+
+        def fill(lang: str, text: str, translation: str) -> List[int]:
+            completed = []
+            for u, pos in segment_owners[text]:
+                pieces[lang][u][pos] = translation
+                waiting[lang][u] -= 1
+                if not waiting[lang][u]:
+                    completed.append(u)
+            return completed
+
+        def complete(lang: str, completed: List[int], from_memory: bool = False) -> None:
+            lang_stats = self.stats.language(lang)
+            journal_entries: List[Tuple[int, str, str]] = []
+            rows = self.apply_translations(lang, [(u, "".join(pieces[lang][u])) for u in completed], journal_entries)
+            if from_memory:
+                lang_stats.memory_hits += rows
+            if repair:
+                lang_stats.repaired_rows += rows
+            context.journals[lang].append(journal_entries)
+
+        missing: Dict[str, List[str]] = {text: [] for text in segment_owners}
+        for lang in langs:
+            remembered: Dict[str, str] = {}
+            if context.memory is not None:
+                remembered = context.memory.lookup(context.from_lang, lang, list(segment_owners))
+            completed = []
+            for text in segment_owners:
+                translation = remembered.get(text)
+                if translation is None:
+                    missing[text].append(lang)
+                    continue
+                completed.extend(fill(lang, text, translation))
+            complete(lang, completed, from_memory=True)
+            if context.memory is not None and not repair:
+                self.stats.language(lang).memory_misses += sum(
+                    len(self.pending_rows(lang, u)) for u in units if waiting[lang][u]
+                )
+            # A text made only of placeholders has nothing to send.
+            complete(lang, [u for u in units if not waiting_counts[u]])
+
+        groups: Dict[Tuple[str, ...], List[str]] = {}
+        for text, text_langs in missing.items():
+            if text_langs:
+                groups.setdefault(tuple(text_langs), []).append(text)
+        sources = []
+        for group_langs, texts in groups.items():
+
+            def on_result(
+                batch: List[int],
+                translations: Dict[str, List[str]],
+                group_langs: Tuple[str, ...] = group_langs,
+                texts: List[str] = texts,
+            ) -> None:
+                mask_stats = self.stats.mask_mode("segments")
+                batch_texts = [texts[position] for position in batch]
+                for lang in group_langs:
+                    completed = []
+                    passed = []
+                    matches = context.workers.check(batch_texts, translations[lang])
+                    for text, translation, matched in zip(batch_texts, translations[lang], matches):
+                        if not matched:
+                            # Units with a failed segment never complete here and go to repair.
+                            mask_stats.qa_failed += 1
+                            mask_stats.wasted_chars += len(text)
+                            for u, _ in segment_owners[text]:
+                                if u not in self.failed[lang]:
+                                    self.failed[lang].append(u)
+                            continue
+                        completed.extend(fill(lang, text, translation))
+                        passed.append((text, translation))
+                    complete(lang, completed)
+                    if context.memory is not None:
+                        context.memory.store(context.from_lang, lang, passed)
+                chars = sum(len(text) for text in batch_texts)
+                mask_stats.texts += len(batch) * len(group_langs)
+                mask_stats.chars += chars * len(group_langs)
+                self.stats.chars_sent += chars * len(group_langs)
+                if repair:
+                    self.stats.repair_chars += chars * len(group_langs)
+                self.settle(len(batch))
+
+            sources.append(BatchSource(list(group_langs), texts, on_result, "segments"))
+        return sources
+
+    def repair_sources(self) -> List[BatchSource]:
+        # Texts that failed QA go through REPAIR_STAGES in order, each stage
+        # retrying what the previous one could not fix, while the shared
+        # character budget lasts. What is left after the last stage stays
+        # untranslated and counts as QA failed.
+        if not any(self.failed.values()):
+            return []
+        failed, self.failed = self.failed, {lang: [] for lang in self.failed}
+        stage = REPAIR_STAGES[self.repair_stage] if self.repair_stage < len(REPAIR_STAGES) else None
+        self.repair_stage += 1
+        budget = self.context.repair_budget
+        alternate = ALTERNATE_MASK_MODES[self.context.mask_mode]
+        sources: List[BatchSource] = []
+        for lang, units in failed.items():
+            affordable = []
+            for u in units:
+                cost = len(encode_masked(self.unique_sources[u], alternate if stage == "alternate" else "tokens"))
+                if stage is None or not budget.take(cost):
+                    self.stats.language(lang).qa_failed += len(self.pending_rows(lang, u))
+                    continue
+                affordable.append(u)
+            if not affordable:
+                continue
+            if stage == "alternate":
+                sources.append(self.make_source([lang], affordable, alternate, repair=True))
+            else:
+                sources.extend(self.make_segment_sources([lang], affordable, repair=True))
+        self.remaining += sum(len(source.texts) for source in sources)
+        if not sources:
+            self.settle(0)
+        return sources
+
+
+def merge_sources(
+    sources: List[BatchSource], translated: Dict[Tuple[str, str, str], str]
+) -> Tuple[List[BatchSource], int]:
+    # Each unique text goes out once, from the queue of the first source that
+    # needs it. run_sources takes those queues in turn, so a small file is not
+    # stuck behind the texts of a big one. Texts an earlier round already sent
+    # are answered from `translated` (mask mode, language, text -> raw
+    # translation), which the merged sources fill in as results arrive.
+    owners_by_langs: Dict[Tuple[Tuple[str, ...], str], Dict[str, List[Tuple[BatchSource, int]]]] = {}
+    firsts: List[Tuple[BatchSource, List[str], List[List[Tuple[BatchSource, int]]]]] = []
+    answered: Dict[int, Tuple[BatchSource, List[int], Dict[str, List[str]]]] = {}
+    saved_chars = 0
+    for source in sources:
+        owners_by_text = owners_by_langs.setdefault((tuple(source.langs), source.mask_mode), {})
+        texts: List[str] = []
+        owners: List[List[Tuple[BatchSource, int]]] = []
+        for position, text in enumerate(source.texts):
+            known: Dict[str, str] = {}
+            for lang in source.langs:
+                translation = translated.get((source.mask_mode, lang, text))
+                if translation is None:
+                    break
+                known[lang] = translation
+            if len(known) == len(source.langs):
+                _, positions, subset = answered.setdefault(
+                    id(source), (source, [], {lang: [] for lang in source.langs})
+                )
+                positions.append(position)
+                for lang in source.langs:
+                    subset[lang].append(known[lang])
+                saved_chars += len(text) * len(source.langs)
+                continue
+            text_owners = owners_by_text.get(text)
+            if text_owners is None:
+                text_owners = owners_by_text[text] = []
+                texts.append(text)
+                owners.append(text_owners)
+            text_owners.append((source, position))
+        if texts:
+            firsts.append((source, texts, owners))
+
+    for (langs, _), owners_by_text in owners_by_langs.items():
+        for text, text_owners in owners_by_text.items():
+            saved_chars += len(text) * (len(text_owners) - 1) * len(langs)
+
+    merged: List[BatchSource] = []
+    for first, texts, owners in firsts:
+
+        def on_result(
+            batch: List[int],
+            translations: Dict[str, List[str]],
+            langs: List[str] = first.langs,
+            mode: str = first.mask_mode,
+            texts: List[str] = texts,
+            owners: List[List[Tuple[BatchSource, int]]] = owners,
+        ) -> None:
+            split: Dict[int, Tuple[BatchSource, List[int], Dict[str, List[str]]]] = {}
+            for j, position in enumerate(batch):
+                for lang in langs:
+                    translated[(mode, lang, texts[position])] = translations[lang][j]
+                for source, local in owners[position]:
+                    _, positions, subset = split.setdefault(id(source), (source, [], {lang: [] for lang in langs}))
+                    positions.append(local)
+                    for lang in langs:
+                        subset[lang].append(translations[lang][j])
+            for source, positions, subset in split.values():
+                source.on_result(positions, subset)
+
+        merged.append(BatchSource(list(first.langs), texts, on_result, first.mask_mode))
+    for source, positions, subset in answered.values():
+        source.on_result(positions, subset)
+    return merged, saved_chars
+
+
+def chars_per_request(context: TranslateContext, lang_count: int) -> int:
+    # Each target language is billed and counted against the request limit separately.
+    return max(1, context.max_chars // lang_count)
+
+
+def run_sources(sources: List[BatchSource], context: TranslateContext) -> None:
+    queue = RoundRobinQueue(
+        [
+            make_queue(source.texts, context.packing, chars_per_request(context, len(source.langs)))
+            for source in sources
+        ],
+        [len(source.texts) for source in sources],
+    )
+
+    def send(batch: List[int]) -> Dict[str, List[str]]:
+        source_idx, positions = queue.locate(batch)
+        source = sources[source_idx]
+        started = time.monotonic()
+        translations = translate_batch(
+            context.transport,
+            context.endpoint,
+            context.key,
+            context.region,
+            context.from_lang,
+            source.langs,
+            [source.texts[position] for position in positions],
+            context.max_retries,
+            context.limiter,
+            context.limits.observe,
+            TEXT_TYPES[source.mask_mode],
+        )
+        # Includes retries and rate-limit waits: the time the batch held a slot.
+        context.batch_latencies.append(time.monotonic() - started)
+        return translations
+
+    def apply(batch: List[int], translations: Dict[str, List[str]]) -> None:
+        source_idx, positions = queue.locate(batch)
+        sources[source_idx].on_result(positions, translations)
+
+    run_batches(queue.next_batch, send, apply, context.limits)
+
+
+def build_context(args: argparse.Namespace) -> TranslateContext:
     key = os.getenv("AZURE_TRANSLATOR_KEY")
     region = os.getenv("AZURE_TRANSLATOR_REGION")
     endpoint = os.getenv("AZURE_TRANSLATOR_ENDPOINT", DEFAULT_ENDPOINT)
-    batch_size = args.batch_size or env_int("TRANSLATE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
-    sleep_between_batches = env_float("TRANSLATE_SLEEP", DEFAULT_SLEEP_BETWEEN_BATCHES)
-    max_retries = env_int("TRANSLATE_MAX_RETRIES", DEFAULT_MAX_RETRIES)
-
     if not key or not region:
-        print("ERROR: AZURE_TRANSLATOR_KEY and AZURE_TRANSLATOR_REGION must be set.", file=sys.stderr)
-        return 1
+        raise ValueError("AZURE_TRANSLATOR_KEY and AZURE_TRANSLATOR_REGION must be set.")
+    packing = args.packing or os.getenv("TRANSLATE_PACKING", DEFAULT_PACKING)
+    if packing not in PACKING_MODES:
+        raise ValueError(f"Unknown packing mode: {packing} (expected one of {', '.join(PACKING_MODES)})")
+    mask_mode = args.mask_mode or os.getenv("TRANSLATE_MASK_MODE", DEFAULT_MASK_MODE)
+    if mask_mode not in MASK_MODES:
+        raise ValueError(f"Unknown mask mode: {mask_mode} (expected one of {', '.join(MASK_MODES)})")
+    to_langs = parse_languages(args.to_lang)
+    if not to_langs:
+        raise ValueError("At least one target language is required.")
 
-    with open(args.input_path, "r", encoding="utf-8", newline="") as infile:
-        reader = csv.DictReader(infile, delimiter="\t")
-        if not reader.fieldnames:
-            print("ERROR: TSV header row is missing.", file=sys.stderr)
-            return 1
-        fieldnames = reader.fieldnames
-        target_column = "translation" if "translation" in fieldnames else None
-        if target_column is None and "translated" in fieldnames:
-            target_column = "translated"
+    request_limits = limits_for_endpoint(endpoint)
+    max_elements = env_int("TRANSLATE_MAX_ELEMENTS", request_limits.max_elements)
+    if packing == "ffd":
+        default_batch_size, default_max_chars = max_elements, request_limits.max_chars
+    else:
+        default_batch_size, default_max_chars = DEFAULT_BATCH_SIZE, MAX_CHARS_PER_REQUEST
+    batch_size = args.batch_size or env_int("TRANSLATE_BATCH_SIZE", default_batch_size)
+    concurrency = args.concurrency or env_int("TRANSLATE_CONCURRENCY", DEFAULT_CONCURRENCY)
+
+    limiter = limiter_for_tier(
+        args.tier or os.getenv("TRANSLATE_TIER", DEFAULT_TIER),
+        chars_per_minute=env_float("TRANSLATE_CHARS_PER_MINUTE", 0.0),
+        requests_per_second=env_float("TRANSLATE_REQUESTS_PER_SECOND", 0.0),
+    )
+    limits: Limits
+    if args.autotune or env_int("TRANSLATE_AUTOTUNE", 0):
+        limits = AimdController(
+            concurrency,
+            batch_size,
+            max_concurrency=env_int("TRANSLATE_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY),
+            max_batch_size=env_int("TRANSLATE_MAX_BATCH_SIZE", max_elements),
+        )
+    else:
+        limits = FixedLimits(concurrency, batch_size)
+    # A single request should never need more than a minute of character quota.
+    max_chars = int(min(env_int("TRANSLATE_MAX_CHARS", default_max_chars), limiter.chars_per_minute))
+
+    min_segment_chars = args.min_segment_chars
+    if min_segment_chars is None:
+        min_segment_chars = env_int("TRANSLATE_MIN_SEGMENT_CHARS", DEFAULT_MIN_SEGMENT_CHARS)
+    repair_budget = args.repair_budget
+    if repair_budget is None:
+        repair_budget = env_int("TRANSLATE_REPAIR_BUDGET", DEFAULT_REPAIR_BUDGET)
+    workers = args.workers
+    if workers is None:
+        workers = env_int("TRANSLATE_WORKERS", DEFAULT_WORKERS)
+
+    memory = None
+    if not args.no_memory:
+        memory = TranslationMemory(args.memory_path or os.getenv("TRANSLATE_MEMORY_PATH", DEFAULT_MEMORY_PATH))
+    pool_size = max(env_int("TRANSLATE_POOL_SIZE", DEFAULT_POOL_SIZE), limits.max_concurrency)
+    return TranslateContext(
+        transport=Transport(pool_size),
+        endpoint=endpoint,
+        key=key,
+        region=region,
+        from_lang=args.from_lang.lower(),
+        to_langs=to_langs,
+        max_retries=env_int("TRANSLATE_MAX_RETRIES", DEFAULT_MAX_RETRIES),
+        limiter=limiter,
+        limits=limits,
+        memory=memory,
+        packing=packing,
+        mask_mode=mask_mode,
+        max_chars=max_chars,
+        min_segment_chars=min_segment_chars,
+        repair_budget=RepairBudget(repair_budget),
+        overwrite=args.overwrite,
+        resume=args.resume,
+        window_rows=(args.window or env_int("TRANSLATE_WINDOW", DEFAULT_WINDOW_ROWS)) if args.stream else None,
+        previous_template=args.previous_path,
+        max_open_files=env_int("TRANSLATE_MAX_OPEN_FILES", DEFAULT_MAX_OPEN_FILES),
+        workers=WorkerPool(workers),
+    )
+
+
+class FileRun:
+    def __init__(self, input_path: str, output_template: str, context: TranslateContext) -> None:
+        self.input_path = input_path
+        self.stats = RunStats()
+        self.started = 0.0
+        self.elapsed = 0.0
+        multiple = len(context.to_langs) > 1
+        previous = {}
+        if context.previous_template:
+            name = os.path.splitext(os.path.basename(input_path))[0]
+            template = context.previous_template.replace("{name}", name)
+            for lang in context.to_langs:
+                previous_path = output_path_for(template, lang, multiple)
+                if not os.path.exists(previous_path):
+                    print(f"WARNING: Previous output {previous_path} not found; translating all rows.", file=sys.stderr)
+                    continue
+                previous[lang] = load_previous(previous_path)
+        with open(input_path, "r", encoding="utf-8", newline="") as infile:
+            fieldnames = next(csv.reader(infile, delimiter="\t"), None)
+        if not fieldnames:
+            raise ValueError(f"TSV header row is missing in {input_path}.")
+        self.fieldnames: List[str] = fieldnames
+        target_column = find_target_column(fieldnames)
         if target_column is None:
-            print("ERROR: Missing 'translation' or 'translated' column.", file=sys.stderr)
+            raise ValueError(f"Missing 'translation' or 'translated' column in {input_path}.")
+        self.target_column = target_column
+        self.output_paths = {lang: output_path_for(output_template, lang, multiple) for lang in context.to_langs}
+        self.journal_paths = {lang: journal_path_for(path) for lang, path in self.output_paths.items()}
+        # The input, plus a .part output and a journal per language, held from open() to finish().
+        self.descriptors = 1 + 2 * len(self.output_paths)
+        self.journals: Dict[str, Journal] = {}
+        self.resumed: Dict[str, Dict[int, Tuple[str, str]]] = {}
+        self.context = dataclasses.replace(context, journals=self.journals, resumed=self.resumed, previous=previous)
+        self.stack = contextlib.ExitStack()
+        self.writers: Dict[str, Any] = {}
+        self.upcoming: Optional[RowTable] = None
+        self.upcoming_masks: Optional[Callable[[], Masked]] = None
+        self.opened = False
+        self.pending_windows = 0
+        self.finished = False
+
+    def open(self) -> None:
+        # Runs when the first window starts, so files waiting in run_files hold no
+        # descriptors, and their waiting time does not count towards elapsed.
+        self.opened = True
+        self.started = time.monotonic()
+        infile = self.stack.enter_context(open(self.input_path, "r", encoding="utf-8", newline=""))
+        reader = csv.reader(infile, delimiter="\t")
+        next(reader, None)
+        self.tables = read_tables(reader, self.fieldnames, self.context.window_rows)
+        for lang, path in self.journal_paths.items():
+            if self.context.resume:
+                self.resumed[lang] = replay_journal(path)
+            self.journals[lang] = Journal(path, resume=self.context.resume)
+        for lang, output_path in self.output_paths.items():
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            outfile = self.stack.enter_context(open(output_path + ".part", "w", encoding="utf-8", newline=""))
+            self.writers[lang] = csv.writer(outfile, delimiter="\t")
+            self.writers[lang].writerow(self.fieldnames)
+        self.upcoming = next(self.tables, None)
+        self.upcoming_masks = self.prefetch_masks(self.context)
+
+    def prefetch_masks(self, context: TranslateContext) -> Optional[Callable[[], Masked]]:
+        # With worker processes, the next window is masked while the current
+        # one is on the network. Uses the same eligibility rule as WindowJob.
+        rows = self.upcoming
+        if rows is None or context.workers.executor is None:
+            return None
+        sources = rows.column("source") or [""] * len(rows)
+        targets = rows.column(self.target_column) or [""] * len(rows)
+        eligible = []
+        for source_text, target_text in zip(sources, targets):
+            source_text = source_text.strip()
+            if source_text and (context.overwrite or not target_text.strip()):
+                eligible.append(source_text)
+        return context.workers.submit_mask(eligible)
+
+    def next_job(self) -> Optional[WindowJob]:
+        if not self.opened:
+            self.open()
+        rows, masks = self.upcoming, self.upcoming_masks
+        if rows is None:
+            if not self.finished and not self.pending_windows:
+                self.finish()
+            return None
+        self.upcoming = next(self.tables, None)
+        self.upcoming_masks = self.prefetch_masks(self.context)
+        job = WindowJob(
+            rows,
+            self.stats.total_rows,
+            self.target_column,
+            self.context,
+            self.stats,
+            masks() if masks is not None else None,
+        )
+        self.pending_windows += 1
+
+        def complete() -> None:
+            for lang, writer in self.writers.items():
+                rows.replace_column(self.target_column, job.targets[lang])
+                rows.write(writer)
+            self.pending_windows -= 1
+            if self.upcoming is None and not self.pending_windows:
+                self.finish()
+
+        job.on_complete = complete
+        return job
+
+    def finish(self) -> None:
+        self.stack.close()
+        for lang, output_path in self.output_paths.items():
+            os.replace(output_path + ".part", output_path)
+            self.journals[lang].discard()
+        self.elapsed = time.monotonic() - self.started
+        self.finished = True
+
+    def abort(self) -> None:
+        self.stack.close()
+        for journal in self.journals.values():
+            journal.close()
+        # Journals stay for --resume; outputs are rewritten from scratch on the next run.
+        for output_path in self.output_paths.values():
+            if os.path.exists(output_path + ".part"):
+                os.remove(output_path + ".part")
+
+
+def run_files(runs: List[FileRun], context: TranslateContext, global_dedupe: bool = False) -> int:
+    # Each round takes the next window of every unfinished file and drains all of
+    # them through one engine run, so small files are not queued behind big ones.
+    # Files join as their descriptors fit in context.max_open_files; the rest
+    # wait, unopened, for a finished file to make room.
+    # With global_dedupe each text is translated once across all files and
+    # rounds instead; the return value is the number of characters that saved.
+    saved_chars = 0
+    translated: Dict[Tuple[str, str, str], str] = {}
+    waiting = list(runs)
+    active: List[FileRun] = []
+    while active or waiting:
+        descriptors = sum(run.descriptors for run in active)
+        while waiting and (not active or descriptors + waiting[0].descriptors <= context.max_open_files):
+            descriptors += waiting[0].descriptors
+            active.append(waiting.pop(0))
+        jobs = []
+        for run in active:
+            job = run.next_job()
+            if job is not None:
+                jobs.append(job)
+        for job in jobs:
+            if job.remaining == 0 and job.on_complete is not None:
+                job.on_complete()
+        sources = [source for job in jobs for source in job.sources]
+        if global_dedupe:
+            sources, saved = merge_sources(sources, translated)
+            saved_chars += saved
+        run_sources(sources, context)
+        while True:
+            repairs = [source for job in jobs for source in job.repair_sources()]
+            if not repairs:
+                break
+            run_sources(repairs, context)
+        active = [run for run in active if not run.finished]
+    return saved_chars
+
+
+def report_failure(exc: BaseException, runs: List[FileRun]) -> None:
+    reason = f"Translation batch failed: {exc}" if isinstance(exc, Exception) else "Interrupted"
+    print(f"ERROR: {reason}", file=sys.stderr)
+    journal_paths = [journal.path for run in runs if not run.finished for journal in run.journals.values()]
+    if journal_paths:
+        print(
+            f"Completed rows are saved in {', '.join(journal_paths)}; rerun with --resume to continue.",
+            file=sys.stderr,
+        )
+
+
+def print_file_summary(run: FileRun, context: TranslateContext) -> None:
+    stats = run.stats
+    to_langs = context.to_langs
+    print(f"Total rows: {stats.total_rows}")
+    print(f"Eligible rows: {stats.eligible_rows}")
+    for lang in to_langs:
+        lang_stats = stats.language(lang)
+        suffix = f" ({lang})" if len(to_langs) > 1 else ""
+        print(f"Translated{suffix}: {lang_stats.translated_rows}")
+        if not suffix:
+            print(f"Skipped: {stats.skipped_rows}")
+        print(f"QA failed{suffix}: {lang_stats.qa_failed}")
+        if context.repair_budget.total:
+            print(f"Recovered by repair{suffix}: {lang_stats.repaired_rows}")
+        if context.resume:
+            print(f"Resumed from journal{suffix}: {lang_stats.resumed_rows}")
+        if lang in run.context.previous:
+            print(f"Reused from previous{suffix}: {lang_stats.reused_rows}")
+            print(f"Changed since previous{suffix}: {lang_stats.changed_rows}")
+            print(f"New since previous{suffix}: {lang_stats.new_rows}")
+        if context.memory is not None:
+            print(f"Memory hits{suffix}: {lang_stats.memory_hits}")
+            print(f"Memory misses{suffix}: {lang_stats.memory_misses}")
+    if len(to_langs) > 1:
+        print(f"Skipped: {stats.skipped_rows}")
+    print(f"Unique texts: {stats.unique_texts}")
+    print(f"Merged by placeholder template: {stats.merged_templates}")
+    print(f"Dedupe ratio: {stats.eligible_rows / max(1, stats.unique_texts):.2f}x")
+    if context.mask_mode == "segments":
+        print(f"Sent whole instead of by segment: {stats.segment_fallbacks}")
+    if stats.split_texts:
+        print(f"Long texts split into pieces: {stats.split_texts}")
+    print_mask_summary([stats])
+    print_repair_summary([stats], context)
+
+
+def print_mask_summary(stats_list: List[RunStats]) -> None:
+    totals: Dict[str, MaskStats] = {}
+    for stats in stats_list:
+        for mode, mask_stats in stats.mask_modes.items():
+            total = totals.setdefault(mode, MaskStats())
+            total.texts += mask_stats.texts
+            total.qa_failed += mask_stats.qa_failed
+            total.chars += mask_stats.chars
+            total.wasted_chars += mask_stats.wasted_chars
+    for mode, total in totals.items():
+        print(
+            f"QA failures ({mode} mask): {total.qa_failed}/{total.texts} texts "
+            f"({total.qa_failed / max(1, total.texts):.2%}), "
+            f"{total.wasted_chars} of {total.chars} characters wasted"
+        )
+
+
+def print_repair_summary(stats_list: List[RunStats], context: TranslateContext) -> None:
+    budget = context.repair_budget
+    if not budget.total:
+        return
+    repair_chars = sum(stats.repair_chars for stats in stats_list)
+    print(f"Repair characters sent: {repair_chars} (budget {budget.total}, {budget.remaining} left)")
+
+
+def print_transport_summary(context: TranslateContext) -> None:
+    pool_stats = context.transport.stats()
+    limiter = context.limiter
+    print(f"HTTP requests: {pool_stats['requests']}")
+    print(f"Connections opened: {pool_stats['opened']}")
+    print(f"Connections reused: {pool_stats['reused']}")
+    print(f"Rate limit tier: {limiter.tier}")
+    print(f"Rate limit wait: {limiter.waited:.1f}s")
+    print(f"Throttled (429) backoffs: {limiter.backoffs}")
+    print(f"Server error (5xx) backoffs: {limiter.server_errors}")
+    print(f"Batching: {context.limits.describe()}")
+    print(f"Packing: {context.packing}, up to {context.max_chars} characters per request")
+
+
+def write_stats_json(
+    path: str, runs: List[FileRun], context: TranslateContext, chars_sent: int, elapsed: float
+) -> None:
+    languages = [lang_stats for run in runs for lang_stats in run.stats.languages.values()]
+    data = {
+        "files": len(runs),
+        "total_rows": sum(run.stats.total_rows for run in runs),
+        "eligible_rows": sum(run.stats.eligible_rows for run in runs),
+        "translated_rows": sum(lang_stats.translated_rows for lang_stats in languages),
+        "qa_failed": sum(lang_stats.qa_failed for lang_stats in languages),
+        "memory_hits": sum(lang_stats.memory_hits for lang_stats in languages),
+        "memory_misses": sum(lang_stats.memory_misses for lang_stats in languages),
+        "unique_texts": sum(run.stats.unique_texts for run in runs),
+        "chars_sent": chars_sent,
+        "http_requests": context.transport.stats()["requests"],
+        "throttled": context.limiter.backoffs,
+        "elapsed": elapsed,
+        "batch_latencies": context.batch_latencies,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as outfile:
+        json.dump(data, outfile)
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        context = build_context(args)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+    started = time.monotonic()
+    with contextlib.closing(context):
+        try:
+            run = FileRun(args.input_path, args.output_path, context)
+        except (OSError, ValueError) as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
             return 1
-        rows = list(reader)
-
-    total_rows = len(rows)
-    eligible_rows = 0
-    translated_rows = 0
-    skipped_rows = 0
-    qa_failed = 0
-
-    indices_to_translate: List[int] = []
-    masked_sources: List[str] = []
-    placeholder_lists: List[List[str]] = []
-
-    for idx, row in enumerate(rows):
-        source_text = (row.get("source") or "").strip()
-        target_text = (row.get(target_column) or "").strip()
-        if not source_text:
-            skipped_rows += 1
-            continue
-        if target_text and not args.overwrite:
-            skipped_rows += 1
-            continue
-        eligible_rows += 1
-        masked, placeholders = mask_placeholders(source_text)
-        indices_to_translate.append(idx)
-        masked_sources.append(masked)
-        placeholder_lists.append(placeholders)
-
-    for batch in batched_indices(masked_sources, batch_size):
-        batch_indices = [indices_to_translate[i] for i in batch]
-        batch_masked = [masked_sources[i] for i in batch]
-        batch_placeholders = [placeholder_lists[i] for i in batch]
         try:
-            batch_translations = translate_batch(
-                endpoint,
-                key,
-                region,
-                args.from_lang.lower(),
-                args.to_lang.lower(),
-                batch_masked,
-                max_retries,
-            )
-        except Exception as exc:
-            print(f"ERROR: Translation batch failed: {exc}", file=sys.stderr)
+            run_files([run], context)
+        except (Exception, KeyboardInterrupt) as exc:
+            # Senders still sleeping in the limiter wake up and stop.
+            context.limiter.stop()
+            run.abort()
+            report_failure(exc, [run])
             return 1
 
-        for idx, masked_source, placeholders, masked_translation in zip(
-            batch_indices, batch_masked, batch_placeholders, batch_translations
-        ):
-            if not placeholders_match(masked_source, masked_translation):
-                qa_failed += 1
-                continue
-            restored = restore_placeholders(masked_translation, placeholders)
-            rows[idx][target_column] = restored
-            translated_rows += 1
-
-        time.sleep(sleep_between_batches)
-
-    output_path = args.output_path
-    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-    with open(output_path, "w", encoding="utf-8", newline="") as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames, delimiter="\t")
-        writer.writeheader()
-        writer.writerows(rows)
-
-    print("Translation summary")
-    print(f"Total rows: {total_rows}")
-    print(f"Eligible rows: {eligible_rows}")
-    print(f"Translated: {translated_rows}")
-    print(f"Skipped: {skipped_rows}")
-    print(f"QA failed: {qa_failed}")
-    print(f"Output: {output_path}")
+        print("Translation summary")
+        print_file_summary(run, context)
+        print_transport_summary(context)
+        if args.stats_json_path:
+            write_stats_json(args.stats_json_path, [run], context, run.stats.chars_sent, time.monotonic() - started)
+    for output_path in run.output_paths.values():
+        print(f"Output: {output_path}")
     return 0
 
 
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from placeholders import mask_placeholders, passes_qa, restore_placeholders
+
+DEFAULT_WORKERS = 1
+CHUNK_TEXTS = 2000
+# Smaller jobs run inline: a round trip through the pool costs more than the work.
+MIN_POOL_TEXTS = 4000
+
+Masked = Tuple[List[str], List[List[str]]]
+
+
+def mask_chunk(texts: List[str]) -> Tuple[List[Optional[str]], List[List[str]]]:
+    # Texts without placeholders come back as None, so they cross the pipe only once.
+    masked_texts: List[Optional[str]] = []
+    placeholder_lists: List[List[str]] = []
+    for text in texts:
+        masked, placeholders = mask_placeholders(text)
+        masked_texts.append(masked if placeholders else None)
+        placeholder_lists.append(placeholders)
+    return masked_texts, placeholder_lists
+
+
+def restore_chunk(translations: List[str], items: List[Tuple[int, List[str]]]) -> List[str]:
+    return [restore_placeholders(translations[t], placeholders) for t, placeholders in items]
+
+
+def check_chunk(sources: List[str], translations: List[str]) -> List[bool]:
+    return [passes_qa(source, translation) for source, translation in zip(sources, translations)]
+
+
+def chunk_bounds(count: int) -> List[Tuple[int, int]]:
+    return [(start, min(count, start + CHUNK_TEXTS)) for start in range(0, count, CHUNK_TEXTS)]
+
+
+class WorkerPool:
+    # Runs the CPU-bound placeholder work (masking windows, restoring memory
+    # hits) in worker processes, in chunks, so it neither holds the GIL the
+    # sender threads need nor stays on one core. With a single worker
+    # everything runs inline.
+    def __init__(self, workers: int = DEFAULT_WORKERS) -> None:
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.executor: Optional[ProcessPoolExecutor] = None
+        if self.workers > 1:
+            # forkserver: the main process already runs sender threads when the pool starts.
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("forkserver"))
+
+    def pool_for(self, count: int) -> Optional[ProcessPoolExecutor]:
+        return self.executor if count >= MIN_POOL_TEXTS else None
+
+    def submit_mask(self, texts: List[str]) -> Callable[[], Masked]:
+        # Starts masking now; the returned function waits for and assembles the result.
+        executor = self.pool_for(len(texts))
+        if executor is None:
+            return lambda: self.mask_inline(texts)
+        futures: List[Future] = [
+            executor.submit(mask_chunk, texts[start:end]) for start, end in chunk_bounds(len(texts))
+        ]
+
+        def collect() -> Masked:
+            masked_texts: List[str] = []
+            placeholder_lists: List[List[str]] = []
+            for future, (start, end) in zip(futures, chunk_bounds(len(texts))):
+                chunk_masked, chunk_placeholders = future.result()
+                masked_texts.extend(
+                    text if masked is None else masked for text, masked in zip(texts[start:end], chunk_masked)
+                )
+                placeholder_lists.extend(chunk_placeholders)
+            return masked_texts, placeholder_lists
+
+        return collect
+
+    def mask_inline(self, texts: List[str]) -> Masked:
+        masked_texts: List[str] = []
+        placeholder_lists: List[List[str]] = []
+        for text in texts:
+            masked, placeholders = mask_placeholders(text)
+            masked_texts.append(masked)
+            placeholder_lists.append(placeholders)
+        return masked_texts, placeholder_lists
+
+    def mask(self, texts: List[str]) -> Masked:
+        return self.submit_mask(texts)()
+
+    def restore(self, translations: List[str], items: List[Tuple[int, List[str]]]) -> List[str]:
+        # items are (index into translations, placeholders) per row. Rows without
+        # placeholders take the translation as is and never reach a worker.
+        restored: List[str] = [translations[t] for t, _ in items]
+        work = [pos for pos, (_, placeholders) in enumerate(items) if placeholders]
+        executor = self.pool_for(len(work))
+        if executor is None:
+            for pos in work:
+                t, placeholders = items[pos]
+                restored[pos] = restore_placeholders(translations[t], placeholders)
+            return restored
+        futures = []
+        for start, end in chunk_bounds(len(work)):
+            # Each chunk carries only the translations its rows refer to, once each.
+            local: Dict[int, int] = {}
+            chunk_items = []
+            for pos in work[start:end]:
+                t, placeholders = items[pos]
+                chunk_items.append((local.setdefault(t, len(local)), placeholders))
+            futures.append(executor.submit(restore_chunk, [translations[t] for t in local], chunk_items))
+        for future, (start, end) in zip(futures, chunk_bounds(len(work))):
+            for pos, text in zip(work[start:end], future.result()):
+                restored[pos] = text
+        return restored
+
+    def check(self, sources: List[str], translations: List[str]) -> List[bool]:
+        # QA runs per network batch, which holds at most the endpoint's element
+        # limit (1000) and never reaches MIN_POOL_TEXTS, so it stays inline.
+        return check_chunk(sources, translations)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)